@@ -6,14 +6,14 @@ import math
 from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
-from typing import Callable, Sequence
+from typing import Sequence
 
 import cv2
 import mediapipe as mp
 import numpy as np
 
 from .config import AnalyzerConfig, POSE_MODEL
-from .models import AnalysisSummary, Sample
+from .models import AnalysisSummary, Sample, SampleBatch
 from .utils import clamp, probe_creation_time, resolve_ts_end_iso, window_bounds
 from .video import VideoWindowExtractor
 
@@ -44,11 +44,10 @@ class WindowAnalyzer:
         session_id: str | None,
         driver_id: str | None,
     ) -> AnalysisSummary:
-        extractor = VideoWindowExtractor(video_path)
-        start, end = window_bounds(extractor.meta.duration, timestamp_seconds, self.config.window_seconds)
-        creation_time = probe_creation_time(video_path)
-
-        samples, stats = self._process_frames(extractor, start, end)
+        with VideoWindowExtractor(video_path) as extractor:
+            start, end = window_bounds(extractor.meta.duration, timestamp_seconds, self.config.window_seconds)
+            creation_time = probe_creation_time(video_path)
+            samples, stats = self._process_frames(extractor, start, end)
         if not samples:
             raise ValueError("no frames were processed for the requested window")
 
@@ -190,11 +189,12 @@ class WindowAnalyzer:
             self.config.ear_threshold_bounds,
             self.config.ear_threshold_percentile,
         )
-        perclos_time = self._integrate_boolean(
-            samples,
+        batch = SampleBatch.from_samples(samples)
+        perclos_time = self._integrate_boolean_np(
+            batch.time,
+            self._is_eye_closed_np(batch.ear, batch.confidence, batch.has_face, ear_thresh),
             start,
             end,
-            lambda sample: self._is_eye_closed(sample, ear_thresh),
         )
         perclos_ratio = perclos_time / window
 
@@ -205,12 +205,8 @@ class WindowAnalyzer:
             self.config.pitch_threshold_bounds,
             self.config.pitch_threshold_percentile,
         )
-        droop_time = self._integrate_boolean(
-            samples,
-            start,
-            end,
-            lambda s: s.pitch_down is not None and s.pitch_down >= pitch_thresh,
-        )
+        # Missing pitch is NaN, which never compares >= the threshold.
+        droop_time = self._integrate_boolean_np(batch.time, batch.pitch_down >= pitch_thresh, start, end)
         droop_duty = droop_time / window
         pitchdown_avg = float(np.mean(pitch_values)) if pitch_values else 0.0
         pitchdown_max = float(np.max(pitch_values)) if pitch_values else 0.0
@@ -222,7 +218,7 @@ class WindowAnalyzer:
             self.config.mar_threshold_bounds,
             self.config.mar_threshold_percentile,
         )
-        yawn_events = self._detect_yawns(samples, start, end, mar_thresh)
+        yawn_events = self._detect_yawns(batch, start, end, mar_thresh)
         yawn_time = sum(evt[1] - evt[0] for evt in yawn_events)
         yawn_duty = yawn_time / window if window else 0.0
         yawn_peak = max((evt[2] for evt in yawn_events), default=0.0)
@@ -505,110 +501,111 @@ class WindowAnalyzer:
         thresh = float(np.percentile(values, percentile))
         return clamp(thresh, bounds[0], bounds[1])
 
-    def _is_eye_closed(self, sample: Sample, ear_thresh: float) -> bool:
-        # Enhanced eye closure detection that handles edge cases more accurately
-        # instead of defaulting everything to "closed"
-        if not sample.has_face:
-            # No face detected - this could be head turned away, not necessarily closed eyes
-            # Only count as closed if this persists (handled by temporal logic)
-            return True
-        if sample.ear is None:
-            # Missing EAR - could be detection failure, not closed eyes
-            # Use temporal interpolation if available, otherwise conservative approach
-            return True
-        
-        # For low confidence samples, use a more nuanced approach
-        if sample.confidence < self.config.confidence_threshold:
-            # If confidence is very low (< 0.3), treat as unknown/closed
-            if sample.confidence < 0.3:
-                return True
-            # For moderate confidence (0.3-0.65), use a relaxed threshold
-            relaxed_thresh = ear_thresh * 0.8  # 20% more lenient
-            return sample.ear < relaxed_thresh
-        
-        # High confidence sample - use standard threshold
-        return sample.ear < ear_thresh
-
-    def _integrate_boolean(
+    def _is_eye_closed_np(
         self,
-        samples: Sequence[Sample],
-        start: float,
-        end: float,
-        predicate: Callable[[Sample], bool],
-    ) -> float:
-        if not samples:
+        ear: np.ndarray,
+        confidence: np.ndarray,
+        has_face: np.ndarray,
+        ear_thresh: float,
+    ) -> np.ndarray:
+        """Per-sample eye-closed mask over ``SampleBatch`` columns.
+
+        Missing faces, missing EAR and very low confidence (< 0.3) count as
+        closed. Moderate-confidence samples use a 20% more lenient threshold.
+        """
+        low_conf = confidence < self.config.confidence_threshold
+        # Missing EAR is NaN, so both threshold comparisons are False for it.
+        below = np.where(low_conf, ear < ear_thresh * 0.8, ear < ear_thresh)
+        return ~has_face | np.isnan(ear) | (low_conf & (confidence < 0.3)) | below
+
+    @staticmethod
+    def _integrate_boolean_np(times: np.ndarray, mask: np.ndarray, start: float, end: float) -> float:
+        """Time ``mask`` is true within [start, end], holding each state until the next sample.
+
+        The first sample's state also covers ``start`` up to that sample, and the
+        last one is held through ``end``.
+        """
+        if not len(times):
             return 0.0
-        total = 0.0
-        prev_time = start
-        prev_state = predicate(samples[0])
-        for sample in samples:
-            t = max(start, min(end, sample.time))
-            dt = max(0.0, t - prev_time)
-            if prev_state and dt:
-                total += dt
-            prev_state = predicate(sample)
-            prev_time = t
-        if prev_state and prev_time < end:
-            total += end - prev_time
+        edges = np.concatenate(([start], np.clip(times, start, end), [end]))
+        durations = np.maximum(np.diff(edges), 0.0)
+        states = np.concatenate((mask[:1], mask))
+        total = float(durations[states].sum())
         return min(end - start, max(0.0, total))
 
     def _detect_yawns(
         self,
-        samples: Sequence[Sample],
+        samples: Sequence[Sample] | SampleBatch,
         start: float,
         end: float,
         threshold: float,
     ) -> list[tuple[float, float, float]]:
-        """Detect yawns from the MAR signal using the same heuristics as the JS demo."""
+        """Detect yawns from the MAR signal using the same heuristics as the JS demo.
+
+        The per-sample flags are computed once as arrays. The hold and refractory
+        state machine then jumps between transitions with ``argmax`` over those
+        arrays instead of stepping through every sample.
+        """
+
+        batch = samples if isinstance(samples, SampleBatch) else SampleBatch.from_samples(samples)
+        n = len(batch)
+        times = np.clip(batch.time, start, end)
+        has_sample = ~np.isnan(batch.mar)
+        mar = np.where(has_sample, batch.mar, 0.0)
+        high_conf = batch.has_face & (batch.confidence >= self.config.confidence_threshold)
+        above = has_sample & (mar > threshold)
+        can_start = above & high_conf
+        # Samples that may close an open yawn: mouth below threshold with a usable reading.
+        closing = ~above & (has_sample | ~high_conf)
 
         events: list[tuple[float, float, float]] = []
-        active = False
-        candidate_start: float | None = None
-        end_candidate: float | None = None
-        last_end: float = -math.inf
-        peak = 0.0
-        start_time: float | None = None
-
-        for sample in samples:
-            t = max(start, min(end, sample.time))
-            mar = sample.mar
-            has_sample = mar is not None
-            mar_value = mar or 0.0
-            high_conf = sample.has_face and sample.confidence >= self.config.confidence_threshold
-            above = bool(has_sample and mar_value > threshold)
-            can_start = above and high_conf
-            can_end = has_sample or not high_conf
-
-            if not active:
-                if can_start and t - last_end >= self.config.yawn_refractory:
-                    if candidate_start is None:
-                        candidate_start = t
-                    if t - candidate_start >= self.config.yawn_start_hold:
-                        active = True
-                        peak = mar_value
-                        start_time = candidate_start
-                        candidate_start = None
-                elif not above:
-                    candidate_start = None
-            else:
-                if above:
-                    peak = max(peak, mar_value)
-                    end_candidate = None
-                elif can_end:
-                    end_candidate = end_candidate or t
-                    if t - end_candidate >= self.config.yawn_end_hold and start_time is not None:
-                        end_time = min(end, t)
-                        events.append((start_time, end_time, peak))
-                        last_end = end_time
-                        active = False
-                        peak = 0.0
-                        start_time = None
-                        end_candidate = None
-                        candidate_start = None
-
-        if active and start_time is not None:
-            end_time = end
-            events.append((start_time, end_time, peak))
+        last_end = -math.inf
+        i = 0
+        while i < n:
+            # Idle: the first eligible sample opens a candidate, which survives until
+            # a sample drops below threshold.
+            eligible = can_start[i:] & (times[i:] - last_end >= self.config.yawn_refractory)
+            if not eligible.any():
+                break
+            first = i + int(eligible.argmax())
+            candidate_start = times[first]
+            drops = ~above[first:]
+            reset = first + int(drops.argmax()) if drops.any() else n
+            held = eligible[first - i : reset - i] & (
+                times[first:reset] - candidate_start >= self.config.yawn_start_hold
+            )
+            if not held.any():
+                i = reset + 1
+                continue
+            onset = first + int(held.argmax())
+
+            # Active: each closing sample after the latest above-threshold sample
+            # measures its hold from the first closing sample of that gap.
+            idx = np.arange(onset + 1, n)
+            tail_above = above[onset + 1 :]
+            closing_idx = idx[closing[onset + 1 :]]
+            end_idx = n
+            if closing_idx.size:
+                gap = np.maximum.accumulate(np.where(tail_above, idx, onset))[
+                    closing_idx - onset - 1
+                ]
+                new_gap = np.empty(gap.size, dtype=bool)
+                new_gap[0] = True
+                new_gap[1:] = gap[1:] != gap[:-1]
+                gap_start = times[closing_idx[new_gap]][np.cumsum(new_gap) - 1]
+                ended = times[closing_idx] - gap_start >= self.config.yawn_end_hold
+                if ended.any():
+                    end_idx = int(closing_idx[ended.argmax()])
+
+            peak_slice = mar[onset + 1 : end_idx][tail_above[: end_idx - onset - 1]]
+            peak = max(float(mar[onset]), float(peak_slice.max()) if peak_slice.size else 0.0)
+            if end_idx == n:
+                events.append((float(candidate_start), end, peak))
+                break
+            end_time = min(end, float(times[end_idx]))
+            events.append((float(candidate_start), end_time, peak))
+            last_end = end_time
+            i = end_idx + 1
         return events
 
     @staticmethod
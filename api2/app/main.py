@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import asyncio
 import copy
 import hashlib
 import json
@@ -11,6 +12,11 @@ from datetime import datetime, timezone
 from pathlib import Path
 from threading import Lock, Thread
 
+try:  # Optional: multithreaded SIMD hashing for large uploads.
+    import blake3
+except ImportError:  # pragma: no cover - SHA-256 via hashlib instead
+    blake3 = None
+
 from fastapi import Depends, FastAPI, File, Form, HTTPException, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
@@ -62,6 +68,41 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.on_event("startup")
+async def _start_snowflake_drainer() -> None:
+    # Keep a reference so the task isn't garbage-collected mid-flight.
+    app.state.snowflake_drainer = asyncio.create_task(snowflake_db.drain_async_queries())
+
+
+# Opt-in bulk loader for measurements; the default path inserts row by row.
+measurement_sink = (
+    snowflake_db.StreamingDrowsinessSink(
+        flush_interval_s=float(os.getenv("SNOWFLAKE_BULK_FLUSH_SECONDS", "5")),
+        max_rows=int(os.getenv("SNOWFLAKE_BULK_MAX_ROWS", "5000")),
+    )
+    if os.getenv("SNOWFLAKE_BULK_MEASUREMENTS") == "1"
+    else None
+)
+
+
+@app.on_event("startup")
+async def _start_measurement_sink() -> None:
+    if measurement_sink is not None:
+        app.state.measurement_sink = asyncio.create_task(measurement_sink.run())
+
+
+@app.on_event("shutdown")
+async def _flush_measurement_sink() -> None:
+    if measurement_sink is not None:
+        await asyncio.to_thread(measurement_sink.flush)
+
+
+@app.on_event("startup")
+async def _prewarm_snowflake_pool() -> None:
+    # Run in a worker thread so slow logins don't hold up the event loop.
+    app.state.snowflake_prewarm = asyncio.create_task(asyncio.to_thread(snowflake_db.prewarm))
+
+
 analyzer = WindowAnalyzer()
 state_classifier = DriverStateClassifier()
 vitals_simulator = VitalsSimulator()
@@ -95,14 +136,20 @@ def _cache_file_path(signature: str) -> Path:
     return CACHE_DIR / f"{digest}.json"
 
 
+def _upload_digest(path: Path) -> str:
+    """Hex content digest of an upload: BLAKE3 when installed, else SHA-256."""
+    if blake3 is not None:
+        hasher = blake3.blake3(max_threads=blake3.blake3.AUTO)
+        hasher.update_mmap(path)
+        return hasher.hexdigest()
+    with path.open("rb") as src:
+        return hashlib.file_digest(src, "sha256").hexdigest()
+
+
 def _materialize_upload_for_cache(tmp_path: Path, original_name: str | None) -> Path:
     """Convert an uploaded temp file into a stable, content-addressed cache entry."""
     suffix = Path(original_name or tmp_path.name).suffix or ".mp4"
-    digest = hashlib.sha256()
-    with tmp_path.open("rb") as src:
-        for chunk in iter(lambda: src.read(1024 * 1024), b""):
-            digest.update(chunk)
-    final_path = UPLOAD_CACHE_DIR / f"{digest.hexdigest()}{suffix}"
+    final_path = UPLOAD_CACHE_DIR / f"{_upload_digest(tmp_path)}{suffix}"
     if final_path.exists():
         tmp_path.unlink(missing_ok=True)
     else:
@@ -263,6 +310,9 @@ def save_analysis_to_snowflake(summary, session_id: str | None, driver_id: str |
         }
         
         # Insert into Snowflake
+        if measurement_sink is not None:
+            measurement_sink.add(measurement_data)
+            return True
         rows_affected = snowflake_db.insert_drowsiness_measurement(measurement_data)
         print(f"[Snowflake] Successfully saved analysis data for session {measurement_data['session_id']}")
         return True
@@ -529,12 +579,14 @@ async def save_driver_status(
         if status not in valid_statuses:
             raise HTTPException(status_code=400, detail=f"Status must be one of: {valid_statuses}")
         
-        # Insert into STATUS_TABLE
+        # Submit the STATUS_TABLE insert; the response doesn't wait for it to land
         try:
-            rows_affected = snowflake_db.insert_status(status)
+            query_id = await run_in_threadpool(snowflake_db.insert_status_async, status)
             timestamp = datetime.now().isoformat()
-            print(f"[Snowflake] Saved status {status} at {timestamp}")
-            return {"success": True, "status": status, "timestamp": timestamp, "rows_affected": rows_affected}
+            print(f"[Snowflake] Queued status {status} at {timestamp} (query {query_id})")
+            # The insert has only been submitted, so report it as queued rather
+            # than claiming a row count; query_id identifies it in Snowflake.
+            return {"success": True, "status": status, "timestamp": timestamp, "queued": True, "query_id": query_id}
         except Exception as snowflake_error:
             # Handle Snowflake connection issues gracefully
             timestamp = datetime.now().isoformat()
@@ -549,8 +601,10 @@ async def save_driver_status(
 
 @app.post("/v1/state", response_model=StateResponse)
 async def classify_state(payload: StateRequest):
+    # One UTC read per request; the store ages records against it.
+    now_utc = datetime.now(timezone.utc)
     response = state_classifier.classify(payload)
-    GLOBAL_STATE_STORE.record(response)
+    GLOBAL_STATE_STORE.record(response, now_utc=now_utc)
     return response
 
 
@@ -662,8 +716,12 @@ async def get_video_info():
 async def reset_session(session_id: str | None = Form(None)):
     """Reset session by clearing all Snowflake data for demo purposes"""
     try:
+        # Push out buffered measurements first so they are cleared too rather
+        # than landing after the reset.
+        if measurement_sink is not None:
+            await asyncio.to_thread(measurement_sink.flush)
         # Clear all demo data (STATUS_TABLE and DROWSINESS_MEASUREMENTS)
-        clear_results = snowflake_db.clear_demo_data()
+        clear_results = await run_in_threadpool(snowflake_db.clear_demo_data)
         
         return {
             "success": True,
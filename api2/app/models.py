@@ -2,9 +2,10 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 from datetime import datetime
-from typing import Optional
+from typing import Optional, Sequence
 
-from pydantic import BaseModel, Field
+import numpy as np
+from pydantic import BaseModel, ConfigDict, Field
 
 
 @dataclass(slots=True)
@@ -17,6 +18,37 @@ class Sample:
     has_face: bool
 
 
+@dataclass(slots=True)
+class SampleBatch:
+    """Column-wise view of a window's samples; missing readings are NaN."""
+
+    time: np.ndarray
+    ear: np.ndarray
+    mar: np.ndarray
+    pitch_down: np.ndarray
+    confidence: np.ndarray
+    has_face: np.ndarray
+
+    @classmethod
+    def from_samples(cls, samples: Sequence[Sample]) -> "SampleBatch":
+        n = len(samples)
+
+        def column(values, dtype=np.float64) -> np.ndarray:
+            return np.fromiter(values, dtype=dtype, count=n)
+
+        return cls(
+            time=column(s.time for s in samples),
+            ear=column(np.nan if s.ear is None else s.ear for s in samples),
+            mar=column(np.nan if s.mar is None else s.mar for s in samples),
+            pitch_down=column(np.nan if s.pitch_down is None else s.pitch_down for s in samples),
+            confidence=column(s.confidence for s in samples),
+            has_face=column((s.has_face for s in samples), dtype=bool),
+        )
+
+    def __len__(self) -> int:
+        return len(self.time)
+
+
 @dataclass(slots=True)
 class StreamMeta:
     fps: float
@@ -111,6 +143,9 @@ class StateReason(BaseModel):
 
 
 class ThresholdsUsed(BaseModel):
+    # One instance is shared by every response from a classifier.
+    model_config = ConfigDict(frozen=True)
+
     perclos_high_15s: float
     perclos_concerning_15s: float
     perclos_elevated_15s: float
@@ -27,9 +27,9 @@ class VitalsSimulator:
         self._metric_cache: Dict[Tuple[str, str, str], _MetricCacheEntry] = {}
 
     def simulate_hr(self, req: VitalsSimRequest) -> HRSimResponse:
-        info = self._resolve_state(req)
-        value, rng = self._simulate_metric("hr", req, info)
         now = datetime.now(timezone.utc)
+        info = self._resolve_state(req, now)
+        value, rng = self._simulate_metric("hr", req, info)
         return HRSimResponse(
             ts=now,
             session_id=req.session_id,
@@ -42,9 +42,9 @@ class VitalsSimulator:
         )
 
     def simulate_hrv(self, req: VitalsSimRequest) -> HRVSimResponse:
-        info = self._resolve_state(req)
-        value, _ = self._simulate_metric("hrv", req, info)
         now = datetime.now(timezone.utc)
+        info = self._resolve_state(req, now)
+        value, _ = self._simulate_metric("hrv", req, info)
         return HRVSimResponse(
             ts=now,
             session_id=req.session_id,
@@ -57,10 +57,10 @@ class VitalsSimulator:
         )
 
     def simulate_vitals(self, req: VitalsSimRequest) -> VitalsSimResponse:
-        info = self._resolve_state(req)
+        now = datetime.now(timezone.utc)
+        info = self._resolve_state(req, now)
         hr_value, _ = self._simulate_metric("hr", req, info)
         hrv_value, _ = self._simulate_metric("hrv", req, info)
-        now = datetime.now(timezone.utc)
         return VitalsSimResponse(
             ts=now,
             session_id=req.session_id,
@@ -85,13 +85,15 @@ class VitalsSimulator:
         range_hr: Tuple[float, float]
         range_hrv: Tuple[float, float]
 
-    def _resolve_state(self, req: VitalsSimRequest) -> _StateInfo:
+    def _resolve_state(self, req: VitalsSimRequest, now_utc: datetime | None = None) -> _StateInfo:
         state_name = req.state
         confidence = "N/A"
         if state_name:
             state_name = state_name.title()
         else:
-            record = GLOBAL_STATE_STORE.latest(req.session_id, req.driver_id, max_age_seconds=120)
+            record = GLOBAL_STATE_STORE.latest(
+                req.session_id, req.driver_id, max_age_seconds=120, now_utc=now_utc
+            )
             if not record:
                 raise HTTPException(status_code=400, detail="no recent state for session/driver")
             state_name = record.state
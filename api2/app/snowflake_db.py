@@ -25,14 +25,30 @@ This keeps the rest of the codebase DB-agnostic while providing a single place
 to add connection pooling, retries, or instrumentation later.
 """
 
-from typing import Any, Dict, Iterable, List, Mapping, Sequence
+from collections import deque
+from contextlib import contextmanager
+from functools import lru_cache
+from operator import itemgetter
+from typing import Any, Deque, Dict, Iterable, Iterator, List, Mapping, Sequence, Tuple
+import asyncio
+import atexit
+import csv
+import gzip
+import io
+import logging
 import os
+import threading
+import time
+import uuid
 from dotenv import load_dotenv
 
+# Load environment variables from .env file. This must happen before the
+# connector import: it reads SF_OCSP_RESPONSE_CACHE_DIR once at import time.
+load_dotenv()
+
 import snowflake.connector
 
-# Load environment variables from .env file
-load_dotenv()
+logger = logging.getLogger("lucid.snowflake")
 
 # Defaults (safe to override via environment)
 DEFAULT_DB = os.getenv("SNOWFLAKE_DATABASE", "LCD_ENDPOINTS")
@@ -46,13 +62,17 @@ def _env_required(name: str) -> str:
     return v
 
 
-def get_conn():
+def get_conn(
+    *,
+    autocommit: bool | None = None,
+    session_parameters: Mapping[str, Any] | None = None,
+    keep_alive: bool = False,
+):
     """Return a fresh snowflake.connector connection.
 
     Caller is responsible for closing the connection (or using a context
-    manager). We intentionally create short-lived connections here because it
-    keeps code simple; if you need pooling or async support, replace this
-    function with a pooled implementation.
+    manager). The module helpers below draw from the read/write pools
+    instead; use this directly for one-off scripts.
     """
     user = _env_required("SNOWFLAKE_USER")
     password = _env_required("SNOWFLAKE_PASSWORD")
@@ -79,27 +99,201 @@ def get_conn():
     
     if warehouse:
         conn_kwargs["warehouse"] = warehouse
+    if autocommit is not None:
+        conn_kwargs["autocommit"] = autocommit
+    if session_parameters:
+        conn_kwargs["session_parameters"] = dict(session_parameters)
+    if keep_alive:
+        # Heartbeat so idle pooled sessions don't expire between requests
+        conn_kwargs["client_session_keep_alive"] = True
 
     return snowflake.connector.connect(**conn_kwargs)
 
 
+class _ConnectionPool:
+    """Keep a handful of authenticated connections alive between calls.
+
+    Opening a Snowflake session costs a TLS handshake plus a login round trip,
+    which dominates small telemetry writes. Connections are handed out LIFO so
+    the warmest session is reused first; broken connections are discarded.
+    """
+
+    def __init__(self, max_idle: int):
+        self._max_idle = max_idle
+        self._idle: list = []
+        self._lock = threading.Lock()
+
+    def _create_new(self):
+        return get_conn()
+
+    def acquire(self):
+        with self._lock:
+            while self._idle:
+                conn = self._idle.pop()
+                if not conn.is_closed():
+                    return conn
+        return self._create_new()
+
+    def release(self, conn) -> None:
+        if conn.is_closed():
+            return
+        with self._lock:
+            if len(self._idle) < self._max_idle:
+                self._idle.append(conn)
+                return
+        conn.close()
+
+    @contextmanager
+    def connection(self) -> Iterator[Any]:
+        conn = self.acquire()
+        try:
+            yield conn
+        except Exception:
+            # Don't hand a connection in an unknown state to the next caller.
+            conn.close()
+            raise
+        self.release(conn)
+
+
+class _ReadPool(_ConnectionPool):
+    """Sessions for SELECTs: result cache enabled, tagged as the reader."""
+
+    def _create_new(self):
+        return get_conn(
+            session_parameters={"USE_CACHED_RESULT": True, "QUERY_TAG": "driver_state_reader"},
+            keep_alive=True,
+        )
+
+
+class _WritePool(_ConnectionPool):
+    """Sessions for DML: autocommit on, tagged as the writer."""
+
+    def _create_new(self):
+        return get_conn(
+            autocommit=True,
+            session_parameters={"QUERY_TAG": "driver_state_writer"},
+            keep_alive=True,
+        )
+
+
+# Separate pools so bursts of dashboard reads can't starve telemetry writes.
+_read_pool = _ReadPool(int(os.getenv("SNOWFLAKE_READ_POOL_MAX", "2")))
+_write_pool = _WritePool(int(os.getenv("SNOWFLAKE_WRITE_POOL_MAX", "8")))
+
+
+def pooled_connection():
+    """Borrow a pooled write session as a context manager.
+
+    The connection goes back to the pool on exit instead of being closed, so
+    scripts that run several loads in one process log in once.
+    """
+    return _write_pool.connection()
+
+
+def small_result_options() -> Dict[str, Any]:
+    """connect() kwargs for sessions that only run a few single-row queries.
+
+    One prefetch thread and JSON results skip the Arrow result path and the
+    prefetch worker pool, which only pay off for large result sets.
+    """
+    return {
+        "client_prefetch_threads": 1,
+        "autocommit": True,
+        "session_parameters": {"PYTHON_CONNECTOR_QUERY_RESULT_FORMAT": "JSON"},
+    }
+
+
+# Connections opened for scripts with their own connect() settings, keyed by
+# those settings so repeated runs in one process reuse the logged-in session.
+_shared_conns: Dict[frozenset, Any] = {}
+_shared_lock = threading.Lock()
+
+
+def shared_connection(**connect_kwargs: Any):
+    """Return an open connection for exactly these connect() kwargs.
+
+    The first call logs in (with session keep-alive); later calls with the
+    same kwargs get the same session back unless it was closed. Callers
+    should close cursors, not the connection; all shared connections are
+    closed at interpreter exit.
+    """
+    connect_kwargs.setdefault("login_timeout", 30)
+    connect_kwargs.setdefault("client_session_keep_alive", True)
+    # session_parameters is a dict; freeze it so the kwargs can key the cache.
+    key = frozenset(
+        (name, frozenset(value.items()) if isinstance(value, dict) else value)
+        for name, value in connect_kwargs.items()
+    )
+    with _shared_lock:
+        conn = _shared_conns.get(key)
+        if conn is None or conn.is_closed():
+            conn = snowflake.connector.connect(**connect_kwargs)
+            _shared_conns[key] = conn
+        return conn
+
+
+@atexit.register
+def close_shared_connections() -> None:
+    with _shared_lock:
+        conns = list(_shared_conns.values())
+        _shared_conns.clear()
+    for conn in conns:
+        try:
+            conn.close()
+        except Exception as e:
+            print(f"[Snowflake] Error closing shared connection: {e}")
+
+
+def prewarm(n: int | None = None) -> int:
+    """Open up to ``n`` connections per pool ahead of the first request.
+
+    Connecting pays for login, OCSP revocation checks and telemetry setup;
+    doing it at startup keeps that cost off the first user-facing query.
+    Returns the number of connections actually opened.
+    """
+    if n is None:
+        n = int(os.getenv("SNOWFLAKE_POOL_MIN", "2"))
+    opened = 0
+    for pool in (_write_pool, _read_pool):
+        for _ in range(min(n, pool._max_idle)):
+            try:
+                conn = pool._create_new()
+            except Exception as e:
+                print(f"[Snowflake] Prewarm stopped after {opened} connection(s): {e}")
+                return opened
+            pool.release(conn)
+            opened += 1
+    return opened
+
+
+_INSERT_STATUS_SQL = "INSERT INTO STATUS_TABLE (STATUS, TIME_CREATED) VALUES (%s, CURRENT_TIMESTAMP())"
+_CLEAR_STATUS_SQL = "DELETE FROM STATUS_TABLE"
+_CLEAR_DEMO_MEASUREMENTS_SQL = "DELETE FROM DROWSINESS_MEASUREMENTS WHERE driver_id LIKE %s OR session_id LIKE %s"
+
+# Query IDs of fire-and-forget statements, kept for later reconciliation.
+# Unbounded on purpose: an id dropped here would hide a failed insert and let
+# clear_demo_data run while that insert is still in flight.
+_ASYNC_POLL_SECONDS = 0.05
+_pending_queries: Deque[str] = deque()
+# One reconcile pass at a time, so ids popped by one poller aren't missing
+# from the count another caller waits on.
+_reconcile_lock = threading.Lock()
+
+
 def fetchall(query: str, params: Sequence[Any] | None = None) -> List[Dict[str, Any]]:
     """Run a SELECT-style query and return a list of dict rows.
 
     Example: fetchall("SELECT * FROM DRIVERS WHERE active = %s", (True,))
     """
-    conn = get_conn()
-    cur = conn.cursor()
-    try:
-        cur.execute(query, params or ())
-        cols = [c[0] for c in cur.description] if cur.description else []
-        rows = cur.fetchall()
-        return [dict(zip(cols, r)) for r in rows]
-    finally:
+    with _read_pool.connection() as conn:
+        cur = conn.cursor()
         try:
-            cur.close()
+            cur.execute(query, params or ())
+            cols = [c[0] for c in cur.description] if cur.description else []
+            rows = cur.fetchall()
+            return [dict(zip(cols, r)) for r in rows]
         finally:
-            conn.close()
+            cur.close()
 
 
 def execute(query: str, params: Sequence[Any] | None = None) -> int:
@@ -107,19 +301,14 @@ def execute(query: str, params: Sequence[Any] | None = None) -> int:
 
     Example: execute("UPDATE DRIVERS SET last_seen = %s WHERE id = %s", (ts, id))
     """
-    conn = get_conn()
-    cur = conn.cursor()
-    try:
-        cur.execute(query, params or ())
-        # Snowflake reports rowcount for DML
-        rowcount = cur.rowcount
-        conn.commit()
-        return rowcount
-    finally:
+    with _write_pool.connection() as conn:
+        cur = conn.cursor()
         try:
-            cur.close()
+            cur.execute(query, params or ())
+            # Snowflake reports rowcount for DML; writer sessions autocommit
+            return cur.rowcount
         finally:
-            conn.close()
+            cur.close()
 
 
 def fetch_drivers() -> List[Dict[str, Any]]:
@@ -136,13 +325,155 @@ def insert_drowsiness_measurement(data: Mapping[str, Any]) -> int:
     """
     if not data:
         raise ValueError("data must be a non-empty mapping")
-    cols = list(data.keys())
-    vals = [data[c] for c in cols]
-    placeholders = ",".join(["%s"] * len(cols))
-    query = f"INSERT INTO DROWSINESS_MEASUREMENTS ({','.join(cols)}) VALUES ({placeholders})"
+    cols = tuple(data.keys())
+    query = _build_insert_sql("DROWSINESS_MEASUREMENTS", cols)
+    vals = itemgetter(*cols)(data)
+    if len(cols) == 1:
+        # itemgetter with a single key returns the bare value, not a tuple
+        vals = (vals,)
     return execute(query, vals)
 
 
+@lru_cache(maxsize=64)
+def _build_insert_sql(table: str, cols: tuple[str, ...]) -> str:
+    placeholders = ",".join(["%s"] * len(cols))
+    return f"INSERT INTO {table} ({','.join(cols)}) VALUES ({placeholders})"
+
+
+def _csv_value(value: Any) -> Any:
+    if value is None:
+        return ""
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return value
+
+
+class StreamingDrowsinessSink:
+    """Buffer measurement rows in-process and bulk-load them with PUT + COPY INTO.
+
+    For continuous streams this turns one INSERT round trip per row into one
+    PUT and one COPY per flush. Rows are grouped by column set, so callers
+    can pass the same dicts they would give insert_drowsiness_measurement.
+
+    A batch whose load fails is put back and retried on the next flush; only
+    rows beyond max_retained_rows (oldest first) are dropped.
+    """
+
+    STAGE = "@~/drowsy_stage"
+
+    def __init__(
+        self,
+        flush_interval_s: float = 5.0,
+        max_rows: int = 5000,
+        max_retained_rows: int | None = None,
+    ):
+        self.flush_interval_s = flush_interval_s
+        self.max_rows = max_rows
+        self.max_retained_rows = max_retained_rows if max_retained_rows is not None else 10 * max_rows
+        self._batches: Dict[Tuple[str, ...], List[Tuple[Any, ...]]] = {}
+        self._buffered = 0
+        # Set while loads are failing; retries are left to the periodic flush
+        # instead of every add() once the buffer is full.
+        self._failing = False
+        self._dropped = 0
+        self._lock = threading.Lock()
+        # Serializes flushes so a caller that flushes knows no earlier load is
+        # still in flight when it returns.
+        self._flush_lock = threading.Lock()
+
+    def add(self, data: Mapping[str, Any]) -> None:
+        """Queue one measurement; flushes inline once max_rows are buffered."""
+        if not data:
+            raise ValueError("data must be a non-empty mapping")
+        cols = tuple(data.keys())
+        row = tuple(_csv_value(data[c]) for c in cols)
+        with self._lock:
+            self._batches.setdefault(cols, []).append(row)
+            self._buffered += 1
+            if self._buffered > self.max_retained_rows:
+                # Loads keep failing and the buffer is at its cap: shed the oldest row.
+                self._batches[cols].pop(0)
+                self._buffered -= 1
+                self._dropped += 1
+            full = self._buffered >= self.max_rows and not self._failing
+        if full:
+            self.flush()
+
+    def flush(self) -> int:
+        """Load everything buffered so far and return the number of rows sent."""
+        with self._flush_lock:
+            with self._lock:
+                batches, self._batches = self._batches, {}
+                self._buffered = 0
+            loaded = 0
+            for cols, rows in batches.items():
+                try:
+                    loaded += self._load(cols, rows)
+                    self._failing = False
+                except Exception:
+                    self._failing = True
+                    logger.exception("Bulk load of %d measurement rows failed; requeued for retry", len(rows))
+                    self._requeue(cols, rows)
+            if self._dropped:
+                logger.error(
+                    "Measurement buffer is capped at %d rows; dropped the oldest %d",
+                    self.max_retained_rows, self._dropped,
+                )
+                self._dropped = 0
+            return loaded
+
+    def _requeue(self, cols: Tuple[str, ...], rows: List[Tuple[Any, ...]]) -> None:
+        with self._lock:
+            # Failed rows are older than anything added since the swap.
+            merged = rows + self._batches.get(cols, [])
+            dropped = max(0, min(len(merged), self._buffered + len(rows) - self.max_retained_rows))
+            if dropped:
+                merged = merged[dropped:]
+                self._dropped += dropped
+            if merged:
+                self._batches[cols] = merged
+            else:
+                self._batches.pop(cols, None)
+            self._buffered += len(rows) - dropped
+
+    def _load(self, cols: Tuple[str, ...], rows: List[Tuple[Any, ...]]) -> int:
+        buf = io.BytesIO()
+        with gzip.GzipFile(fileobj=buf, mode="wb") as gz:
+            text = io.TextIOWrapper(gz, encoding="utf-8", newline="")
+            csv.writer(text).writerows(rows)
+            text.flush()
+            text.detach()
+        buf.seek(0)
+
+        name = f"drowsy_{uuid.uuid4().hex}.csv.gz"
+        with _write_pool.connection() as conn:
+            cur = conn.cursor()
+            try:
+                cur.execute(
+                    f"PUT file://{name} {self.STAGE} AUTO_COMPRESS=FALSE SOURCE_COMPRESSION=GZIP",
+                    file_stream=buf,
+                )
+                cur.execute(
+                    f"COPY INTO DROWSINESS_MEASUREMENTS ({','.join(cols)}) FROM {self.STAGE} "
+                    f"FILES=('{name}') "
+                    "FILE_FORMAT=(TYPE=CSV COMPRESSION=GZIP FIELD_OPTIONALLY_ENCLOSED_BY='\"' NULL_IF=('')) "
+                    "PURGE=TRUE"
+                )
+            finally:
+                cur.close()
+        logger.info("Bulk loaded %d measurement rows via %s", len(rows), name)
+        return len(rows)
+
+    async def run(self) -> None:
+        """Background loop that flushes the buffer every flush_interval_s."""
+        while True:
+            await asyncio.sleep(self.flush_interval_s)
+            try:
+                await asyncio.to_thread(self.flush)
+            except Exception:
+                logger.exception("Measurement flush failed")
+
+
 def insert_status(status: str) -> int:
     """Insert a status record into STATUS_TABLE and return affected row count.
     
@@ -151,14 +482,110 @@ def insert_status(status: str) -> int:
     if not status:
         raise ValueError("status must be a non-empty string")
     
-    query = "INSERT INTO STATUS_TABLE (STATUS, TIME_CREATED) VALUES (%s, CURRENT_TIMESTAMP())"
-    return execute(query, (status,))
+    return execute(_INSERT_STATUS_SQL, (status,))
+
+
+def insert_status_batch(statuses: Sequence[str]) -> int:
+    """Insert many STATUS_TABLE rows in one executemany round trip.
+
+    Returns the number of rows inserted.
+    """
+    if not statuses:
+        return 0
+    if not all(statuses):
+        raise ValueError("status must be a non-empty string")
 
+    with _write_pool.connection() as conn:
+        cur = conn.cursor()
+        try:
+            cur.executemany(_INSERT_STATUS_SQL, [(status,) for status in statuses])
+            return cur.rowcount
+        finally:
+            cur.close()
 
-def clear_status_table() -> int:
-    """Clear all records from STATUS_TABLE and return affected row count."""
-    query = "DELETE FROM STATUS_TABLE"
-    return execute(query, ())
+
+def insert_status_async(status: str) -> str:
+    """Submit a STATUS_TABLE insert without waiting for it to complete.
+
+    Returns the Snowflake query id. The id is also queued so
+    `drain_async_queries` can report failures later. No explicit commit is
+    issued; Snowflake auto-commits each statement.
+    """
+    if not status:
+        raise ValueError("status must be a non-empty string")
+
+    with _write_pool.connection() as conn:
+        query_id = _submit_async(conn, _INSERT_STATUS_SQL, (status,))
+    _pending_queries.append(query_id)
+    return query_id
+
+
+def _submit_async(conn, query: str, params: Sequence[Any]) -> str:
+    cur = conn.cursor()
+    try:
+        cur.execute_async(query, params)
+        return cur.sfqid
+    finally:
+        cur.close()
+
+
+def _await_rowcount(conn, query_id: str) -> int:
+    """Block until an async DML statement finishes and return its row count."""
+    while conn.is_still_running(conn.get_query_status_throw_if_error(query_id)):
+        time.sleep(_ASYNC_POLL_SECONDS)
+    cur = conn.cursor()
+    try:
+        cur.get_results_from_sfqid(query_id)
+        row = cur.fetchone()
+        return int(row[0]) if row else 0
+    finally:
+        cur.close()
+
+
+def reconcile_async_queries() -> int:
+    """Poll queued async queries once and return how many are still running.
+
+    Finished queries are dropped; failed ones are logged.
+    """
+    with _reconcile_lock:
+        if not _pending_queries:
+            return 0
+        with _write_pool.connection() as conn:
+            for _ in range(len(_pending_queries)):
+                query_id = _pending_queries.popleft()
+                try:
+                    status = conn.get_query_status(query_id)
+                except Exception as e:
+                    print(f"[Snowflake] Could not poll async query {query_id}: {e}")
+                    continue
+                if conn.is_still_running(status):
+                    _pending_queries.append(query_id)
+                elif conn.is_an_error(status):
+                    print(f"[Snowflake] Async query {query_id} failed with status {status.name}")
+        return len(_pending_queries)
+
+
+def wait_for_async_queries(timeout_s: float = 30.0) -> int:
+    """Block until every queued async query has finished or timeout_s passes.
+
+    Returns how many were still running at the deadline (0 once drained).
+    """
+    deadline = time.monotonic() + timeout_s
+    remaining = reconcile_async_queries()
+    while remaining and time.monotonic() < deadline:
+        time.sleep(_ASYNC_POLL_SECONDS)
+        remaining = reconcile_async_queries()
+    return remaining
+
+
+async def drain_async_queries(interval_seconds: float = 5.0) -> None:
+    """Background loop that periodically reconciles fire-and-forget queries."""
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            await asyncio.to_thread(reconcile_async_queries)
+        except Exception as e:
+            print(f"[Snowflake] Async query reconciliation failed: {e}")
 
 
 def clear_demo_data() -> dict:
@@ -166,15 +593,19 @@ def clear_demo_data() -> dict:
     results = {}
     
     try:
-        # Clear STATUS_TABLE completely
-        status_count = clear_status_table()
+        # Status inserts are fire-and-forget; let the queued ones land first so
+        # they can't reappear in the table after it has been cleared.
+        still_running = wait_for_async_queries()
+        if still_running:
+            print(f"[Snowflake] Clearing with {still_running} status inserts still running")
+        with _write_pool.connection() as conn:
+            # Start both DELETEs before waiting so they run concurrently.
+            status_qid = _submit_async(conn, _CLEAR_STATUS_SQL, ())
+            drowsiness_qid = _submit_async(conn, _CLEAR_DEMO_MEASUREMENTS_SQL, ("demo%", "session_%"))
+            status_count = _await_rowcount(conn, status_qid)
+            drowsiness_count = _await_rowcount(conn, drowsiness_qid)
+
         results['status_cleared'] = status_count
-        
-        # Clear DROWSINESS_MEASUREMENTS for demo sessions
-        drowsiness_count = execute(
-            "DELETE FROM DROWSINESS_MEASUREMENTS WHERE driver_id LIKE %s OR session_id LIKE %s",
-            ("demo%", "session_%")
-        )
         results['drowsiness_cleared'] = drowsiness_count
         
         print(f"[Snowflake] Cleared {status_count} status records and {drowsiness_count} drowsiness records")
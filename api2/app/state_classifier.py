@@ -3,32 +3,264 @@
 from __future__ import annotations
 
 import logging
-from dataclasses import dataclass
-from datetime import datetime, timedelta, timezone
-from typing import Dict, Tuple
+import time
+from bisect import bisect_left
+from collections import OrderedDict
+from typing import NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
 
 from .config import STATE_THRESHOLDS, StateThresholds
 from .models import StateReason, StateRequest, StateResponse, ThresholdsUsed
+from .utils import driver_key
 
 logger = logging.getLogger("lucid.state")
 
-
-@dataclass
-class _StateCacheEntry:
-    state: str
-    timestamp: datetime
-    consecutive_lower: int = 0
+# States ordered by severity; the hysteresis cache stores the index.
+_STATES = ("Lucid", "Drowsy", "Asleep")
+_STATE_TO_INT = {name: idx for idx, name in enumerate(_STATES)}
+
+# Upper bound on (session, driver) pairs tracked for hysteresis.
+MAX_TRACKED_DRIVERS = 10_000
+
+# Distinct bucket signal vectors whose pre-hysteresis result is memoized.
+MAX_CACHED_SIGNAL_VECTORS = 4096
+
+# Emit bucket_state on every state change, plus one in every N buckets otherwise.
+LOG_EVERY_N_BUCKETS = 20
+
+# Risk score weights for PERCLOS, yawn duty and droop duty.
+_RISK_W_PERCLOS, _RISK_W_YAWN, _RISK_W_DROOP = 0.7, 0.15, 0.15
+
+# PERCLOS bands, most to least severe. _BAND_NONE means below every breakpoint.
+_BAND_A1, _BAND_A2, _BAND_A3, _BAND_D1, _BAND_D2, _BAND_L_NEAR, _BAND_NONE = range(7)
+
+
+class Signals(NamedTuple):
+    """Bucket signals after defaulting and clipping."""
+
+    perclos_15s: float
+    ear_thresh_T: float
+    pitchdown_avg_15s: float
+    pitchdown_max_15s: float
+    droop_time_15s: float
+    droop_duty_15s: float
+    pitch_thresh_Tp: float
+    yawn_count_15s: int
+    yawn_time_15s: float
+    yawn_duty_15s: float
+    yawn_peak_15s: float
+    confidence: str
+    fps: float
+
+
+_FIELD_ORDER: Tuple[str, ...] = Signals._fields
+_FIELD_DEFAULTS = Signals(
+    perclos_15s=0.0,
+    ear_thresh_T=0.0,
+    pitchdown_avg_15s=0.0,
+    pitchdown_max_15s=0.0,
+    droop_time_15s=0.0,
+    droop_duty_15s=0.0,
+    pitch_thresh_Tp=0.0,
+    yawn_count_15s=0,
+    yawn_time_15s=0.0,
+    yawn_duty_15s=0.0,
+    yawn_peak_15s=0.0,
+    confidence="OK",
+    fps=0.0,
+)
+_UNIT_FIELDS = frozenset({"perclos_15s", "yawn_duty_15s", "droop_duty_15s"})
+_FIELD_CLIP_LO: Tuple[Optional[float], ...] = tuple(0.0 if f in _UNIT_FIELDS else None for f in _FIELD_ORDER)
+_FIELD_CLIP_HI: Tuple[Optional[float], ...] = tuple(1.0 if f in _UNIT_FIELDS else None for f in _FIELD_ORDER)
+_FIELD_SPECS = tuple(zip(_FIELD_ORDER, _FIELD_DEFAULTS, _FIELD_CLIP_LO, _FIELD_CLIP_HI))
+
+
+def _make_reason(signal: str, value, threshold, relation: str) -> StateReason:
+    """Build a StateReason without running pydantic validation.
+
+    Inputs come from already-typed signals, so the only coercion validation
+    would do is int -> float for the numeric fields; mirror that here.
+    """
+    if type(value) is int:
+        value = float(value)
+    if type(threshold) is int:
+        threshold = float(threshold)
+    return StateReason.model_construct(signal=signal, value=value, threshold=threshold, relation=relation)
 
 
 class DriverStateClassifier:
     def __init__(self, thresholds: StateThresholds | None = None):
         self.thresholds = thresholds or STATE_THRESHOLDS
-        self._cache: Dict[Tuple[str, str], _StateCacheEntry] = {}
+        # key -> (state index, monotonic timestamp, consecutive lower buckets), oldest first
+        self._cache: "OrderedDict[str, Tuple[int, float, int]]" = OrderedDict()
+        self._last_logged_state: dict[str, str] = {}
+        # raw signal tuple -> (raw_state, risk, state_confidence, fps, reason tuples)
+        self._core_cache: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._bucket_counter = 0
+
+        t = self.thresholds
+        # Every (signal, relation, threshold) a reason can carry gets a small int
+        # id up front, so per-bucket de-duplication is a set of ints.
+        self._reason_ids: dict[tuple, int] = {}
+        rid = self._reason_id
+        self._field_specs = tuple(
+            (field, fallback, lo, hi, rid(f"missing:{field}", "missing", 0))
+            for field, fallback, lo, hi in _FIELD_SPECS
+        )
+        self._confidence_rid = rid("confidence", "!=", "OK")
+        self._fps_rid = rid("fps", "<", t.fps_min_ok)
+        self._perclos_rids = {
+            _BAND_A1: rid("perclos_15s", ">=", t.perclos_asleep_primary),
+            _BAND_A2: rid("perclos_15s", ">=", t.perclos_asleep_confirm),
+            _BAND_A3: rid("perclos_15s", ">=", t.perclos_asleep_broad),
+            _BAND_D1: rid("perclos_15s", ">=", t.perclos_drowsy_primary),
+            _BAND_D2: rid("perclos_15s", ">=", t.perclos_drowsy_assist),
+            _BAND_L_NEAR: rid("perclos_15s", "near_threshold", t.perclos_lucid_near),
+        }
+
+        # Risk normalization: (x - min) * inv, with 1 / (max - min) precomputed.
+        # Thresholds are fixed per instance, so the response payload is built once.
+        self._thresholds_payload = ThresholdsUsed(
+            perclos_high_15s=t.perclos_high_30s,
+            perclos_concerning_15s=t.perclos_concerning_30s,
+            perclos_elevated_15s=t.perclos_elevated_30s,
+            yawn_duty_concerning=t.yawn_duty_concerning,
+            yawn_duty_high=t.yawn_duty_high,
+            droop_duty_concerning=t.droop_duty_concerning,
+            droop_duty_high=t.droop_duty_high,
+            pitchdown_max_flag=t.pitchdown_flag,
+        )
+        self._thresholds_payload_dump = self._thresholds_payload.model_dump()
+
+        self._perclos_risk_min = t.perclos_risk_min
+        self._perclos_risk_inv = 1.0 / (t.perclos_risk_max - t.perclos_risk_min)
+        self._yawn_risk_min = t.yawn_risk_min
+        self._yawn_risk_inv = 1.0 / (t.yawn_risk_max - t.yawn_risk_min)
+        self._droop_risk_min = t.droop_risk_min
+        self._droop_risk_inv = 1.0 / (t.droop_risk_max - t.droop_risk_min)
+
+        bands = sorted(
+            (
+                (t.perclos_asleep_primary, _BAND_A1),
+                (t.perclos_asleep_confirm, _BAND_A2),
+                (t.perclos_asleep_broad, _BAND_A3),
+                (t.perclos_drowsy_primary, _BAND_D1),
+                (t.perclos_drowsy_assist, _BAND_D2),
+                (t.perclos_lucid_near, _BAND_L_NEAR),
+            ),
+            key=lambda item: -item[0],
+        )
+        self._perclos_bands = tuple(bands)
+        # Negated so bisect_left finds the first (highest) breakpoint <= perclos.
+        self._perclos_breakpoints_neg = [-breakpoint for breakpoint, _ in bands]
+        self._perclos_band_ids = tuple(band for _, band in bands) + (_BAND_NONE,)
+        self._perclos_breakpoints_neg_arr = np.asarray(self._perclos_breakpoints_neg, dtype=np.float64)
+        self._perclos_band_ids_arr = np.asarray(self._perclos_band_ids, dtype=np.int64)
+
+        # (signal field, threshold, tag, reason id) checked with ">=" in order.
+        self._asleep_confirmer_rules = self._build_rules(
+            ("droop_duty_15s", t.droop_duty_asleep, "droop"),
+            ("pitchdown_max_15s", t.pitchdown_asleep, "pitch"),
+            ("yawn_duty_15s", t.yawn_duty_asleep, "yawn_duty"),
+            ("yawn_count_15s", t.yawn_count_threshold, "yawn_count"),
+        )
+        self._drowsy_supporter_rules = self._build_rules(
+            ("yawn_duty_15s", t.yawn_duty_drowsy, "yawn_duty"),
+            ("yawn_count_15s", t.yawn_count_threshold, "yawn_count"),
+            ("droop_duty_15s", t.droop_duty_asleep, "droop"),
+            ("pitchdown_max_15s", t.pitchdown_drowsy, "pitch"),
+        )
+
+    def _reason_id(self, signal: str, relation: str, threshold) -> int:
+        return self._reason_ids.setdefault((signal, relation, threshold), len(self._reason_ids))
+
+    def _build_rules(self, *rules):
+        return tuple(
+            (field, threshold, tag, self._reason_id(field, ">=", threshold))
+            for field, threshold, tag in rules
+        )
+
+    def _perclos_band(self, perclos: float) -> int:
+        """Return the most severe PERCLOS band whose breakpoint is met."""
+        return self._perclos_band_ids[bisect_left(self._perclos_breakpoints_neg, -perclos)]
 
     def classify(self, bucket: StateRequest) -> StateResponse:
-        seen = set()
-        reasons: list[StateReason] = []
-        signals = self._extract_signals(bucket, reasons, seen)
+        # Everything before hysteresis depends only on the signal fields, and
+        # live streams repeat identical vectors (warm-up zeros, steady Lucid).
+        key = tuple([getattr(bucket, field) for field in _FIELD_ORDER])
+        core = self._core_cache.get(key)
+        if core is None:
+            seen: set[int] = set()
+            reasons: list[StateReason] = []
+            signals = self._extract_signals(bucket, reasons, seen)
+            band = self._perclos_band(signals.perclos_15s)
+            risk_score = self._compute_risk(signals)
+            raw_state, risk_score, state_confidence = self._evaluate(bucket, signals, band, risk_score, reasons, seen)
+            fps = signals.fps
+            self._core_cache[key] = (
+                raw_state,
+                risk_score,
+                state_confidence,
+                fps,
+                tuple((r.signal, r.value, r.threshold, r.relation) for r in reasons),
+            )
+            if len(self._core_cache) > MAX_CACHED_SIGNAL_VECTORS:
+                self._core_cache.popitem(last=False)
+        else:
+            self._core_cache.move_to_end(key)
+            raw_state, risk_score, state_confidence, fps, reason_rows = core
+            reasons = [_make_reason(*row) for row in reason_rows]
+        return self._respond(bucket, raw_state, risk_score, state_confidence, fps, reasons)
+
+    def classify_batch(self, buckets: Sequence[StateRequest]) -> list[StateResponse]:
+        """Classify many buckets, vectorizing PERCLOS banding and risk scoring.
+
+        Buckets are processed in order, so hysteresis sees the same sequence
+        as repeated classify() calls and the responses are identical.
+        """
+        if not buckets:
+            return []
+        extracted = []
+        for bucket in buckets:
+            seen: set[int] = set()
+            reasons: list[StateReason] = []
+            extracted.append((self._extract_signals(bucket, reasons, seen), reasons, seen))
+
+        n = len(extracted)
+        perclos = np.fromiter((sig.perclos_15s for sig, _, _ in extracted), dtype=np.float64, count=n)
+        yawn_duty = np.fromiter((sig.yawn_duty_15s for sig, _, _ in extracted), dtype=np.float64, count=n)
+        droop_duty = np.fromiter((sig.droop_duty_15s for sig, _, _ in extracted), dtype=np.float64, count=n)
+
+        bands = self._perclos_band_ids_arr[np.searchsorted(self._perclos_breakpoints_neg_arr, -perclos, side="left")]
+        # Normalize in place: the signal arrays aren't needed after this.
+        p = np.clip((perclos - self._perclos_risk_min) * self._perclos_risk_inv, 0.0, 1.0, out=perclos)
+        y = np.clip((yawn_duty - self._yawn_risk_min) * self._yawn_risk_inv, 0.0, 1.0, out=yawn_duty)
+        d = np.clip((droop_duty - self._droop_risk_min) * self._droop_risk_inv, 0.0, 1.0, out=droop_duty)
+        # np.rint rounds half to even, matching round() in _compute_risk.
+        risks = np.rint(100 * (_RISK_W_PERCLOS * p + _RISK_W_YAWN * y + _RISK_W_DROOP * d)).astype(np.int64)
+
+        responses = []
+        for bucket, (sig, reasons, seen), band, risk in zip(buckets, extracted, bands.tolist(), risks.tolist()):
+            raw_state, risk_score, state_confidence = self._evaluate(bucket, sig, band, risk, reasons, seen)
+            responses.append(self._respond(bucket, raw_state, risk_score, state_confidence, sig.fps, reasons))
+        return responses
+
+    def _evaluate(
+        self,
+        bucket: StateRequest,
+        signals: Signals,
+        band: int,
+        risk_score: int,
+        reasons: list[StateReason],
+        seen: set[int],
+    ) -> tuple[str, int, str]:
+        """Run the rules for one bucket, appending to reasons.
+
+        Returns (raw_state, risk_score, state_confidence) before hysteresis.
+        """
+        fps_min_ok = self.thresholds.fps_min_ok
+        fps = signals.fps
 
         state_confidence = "OK"
         confidence_label = (bucket.confidence or "OK").upper()
@@ -36,26 +268,28 @@ class DriverStateClassifier:
             self._push_reason(
                 reasons,
                 seen,
+                self._confidence_rid,
                 signal="confidence",
                 value=confidence_label,
                 threshold="OK",
                 relation="!=",
             )
             state_confidence = "LOW"
-        if signals["fps"] < self.thresholds.fps_min_ok:
+        if fps < fps_min_ok:
             self._push_reason(
                 reasons,
                 seen,
+                self._fps_rid,
                 signal="fps",
-                value=signals["fps"],
-                threshold=self.thresholds.fps_min_ok,
+                value=fps,
+                threshold=fps_min_ok,
                 relation="<",
             )
             state_confidence = "LOW"
 
-        asleep_reasons = self._evaluate_asleep(signals, seen)
-        drowsy_reasons = [] if asleep_reasons else self._evaluate_drowsy(signals, seen)
-        lucid_reasons = [] if (asleep_reasons or drowsy_reasons) else self._evaluate_lucid(signals, seen)
+        asleep_reasons = self._evaluate_asleep(signals, seen, band)
+        drowsy_reasons = [] if asleep_reasons else self._evaluate_drowsy(signals, seen, band)
+        lucid_reasons = [] if (asleep_reasons or drowsy_reasons) else self._evaluate_lucid(signals, seen, band)
 
         raw_state = "Lucid"
         if asleep_reasons:
@@ -67,38 +301,48 @@ class DriverStateClassifier:
         else:
             reasons.extend(lucid_reasons)
 
-        risk_score = self._compute_risk(signals)
         if raw_state == "Asleep":
             risk_score = max(risk_score, 90)
-
-        final_state = self._apply_hysteresis(bucket.session_id, bucket.driver_id, raw_state, risk_score)
-
-        thresholds_payload = ThresholdsUsed(
-            perclos_high_15s=self.thresholds.perclos_high_30s,
-            perclos_concerning_15s=self.thresholds.perclos_concerning_30s,
-            perclos_elevated_15s=self.thresholds.perclos_elevated_30s,
-            yawn_duty_concerning=self.thresholds.yawn_duty_concerning,
-            yawn_duty_high=self.thresholds.yawn_duty_high,
-            droop_duty_concerning=self.thresholds.droop_duty_concerning,
-            droop_duty_high=self.thresholds.droop_duty_high,
-            pitchdown_max_flag=self.thresholds.pitchdown_flag,
-        )
-
-        logger.info(
-            "bucket_state",
-            extra={
-                "session_id": bucket.session_id,
-                "driver_id": bucket.driver_id,
-                "ts_end": bucket.ts_end.isoformat(),
-                "state_raw": raw_state,
-                "state_final": final_state,
-                "risk_score": risk_score,
-                "state_confidence": state_confidence,
-                "reasons": [reason.model_dump() for reason in reasons],
-                "thresholds_used": thresholds_payload.model_dump(),
-                "fps": signals["fps"],
-            },
+        return raw_state, risk_score, state_confidence
+
+    def _respond(
+        self,
+        bucket: StateRequest,
+        raw_state: str,
+        risk_score: int,
+        state_confidence: str,
+        fps: float,
+        reasons: list[StateReason],
+    ) -> StateResponse:
+        """Apply hysteresis, log, and build the response for one bucket."""
+        cache_key = driver_key(bucket.session_id, bucket.driver_id)
+        final_state = self._apply_hysteresis(cache_key, raw_state, risk_score)
+        thresholds_payload = self._thresholds_payload
+
+        # Log state changes plus a periodic sample; skip building the payload
+        # (isoformat + model_dumps) entirely when INFO is filtered out.
+        self._bucket_counter += 1
+        should_log = (
+            final_state != self._last_logged_state.get(cache_key)
+            or self._bucket_counter % LOG_EVERY_N_BUCKETS == 0
         )
+        if should_log and logger.isEnabledFor(logging.INFO):
+            self._last_logged_state[cache_key] = final_state
+            logger.info(
+                "bucket_state",
+                extra={
+                    "session_id": bucket.session_id,
+                    "driver_id": bucket.driver_id,
+                    "ts_end": bucket.ts_end.isoformat(),
+                    "state_raw": raw_state,
+                    "state_final": final_state,
+                    "risk_score": risk_score,
+                    "state_confidence": state_confidence,
+                    "reasons": [reason.model_dump() for reason in reasons],
+                    "thresholds_used": self._thresholds_payload_dump,
+                    "fps": fps,
+                },
+            )
 
         return StateResponse(
             ts_end=bucket.ts_end,
@@ -113,233 +357,173 @@ class DriverStateClassifier:
 
     # ------------------------------------------------------------------
 
-    def _extract_signals(self, bucket: StateRequest, reasons: list[StateReason], seen: set) -> dict:
-        signals = {}
-        clip_fields = {
-            "perclos_15s": (0.0, 1.0),
-            "yawn_duty_15s": (0.0, 1.0),
-            "droop_duty_15s": (0.0, 1.0),
-        }
-        defaults = {
-            "perclos_15s": 0.0,
-            "ear_thresh_T": 0.0,
-            "pitchdown_avg_15s": 0.0,
-            "pitchdown_max_15s": 0.0,
-            "droop_time_15s": 0.0,
-            "droop_duty_15s": 0.0,
-            "pitch_thresh_Tp": 0.0,
-            "yawn_count_15s": 0,
-            "yawn_time_15s": 0.0,
-            "yawn_duty_15s": 0.0,
-            "yawn_peak_15s": 0.0,
-            "confidence": "OK",
-            "fps": 0.0,
-        }
-        for field, fallback in defaults.items():
+    def _extract_signals(self, bucket: StateRequest, reasons: list[StateReason], seen: set) -> Signals:
+        values = []
+        for field, fallback, lo, hi, reason_id in self._field_specs:
             value = getattr(bucket, field)
             if value is None:
                 value = fallback
                 self._push_reason(
                     reasons,
                     seen,
+                    reason_id,
                     signal=f"missing:{field}",
                     value=None,
                     threshold=0,
                     relation="missing",
                 )
-            if field in clip_fields:
-                min_val, max_val = clip_fields[field]
-                value = max(min_val, min(max_val, value))
-            signals[field] = value
-        return signals
-
-    def _evaluate_asleep(self, signals, seen):
+            if lo is not None:
+                # Same result as max(lo, min(hi, value)), NaN included, without the calls.
+                value = value if value < hi else hi
+                value = value if value > lo else lo
+            values.append(value)
+        return Signals._make(values)
+
+    def _evaluate_asleep(self, signals: Signals, seen: set, band: int) -> list[StateReason]:
         """PERCLOS-first asleep evaluation with confirmatory signals."""
         reasons: list[StateReason] = []
-        perclos = signals["perclos_15s"]
-        yawn_duty = signals["yawn_duty_15s"]
-        yawn_count = signals["yawn_count_15s"]
-        droop_duty = signals["droop_duty_15s"]
-        pitch_max = signals["pitchdown_max_15s"]
+        if band > _BAND_A3:
+            return reasons
+
+        t = self.thresholds
+        perclos = signals.perclos_15s
 
         # A1: Primary asleep rule - PERCLOS ≥ 0.50
-        if perclos >= self.thresholds.perclos_asleep_primary:
-            self._push_reason(reasons, seen, "perclos_15s", perclos, self.thresholds.perclos_asleep_primary, ">=")
+        if band == _BAND_A1:
+            self._push_reason(reasons, seen, self._perclos_rids[_BAND_A1], "perclos_15s", perclos, t.perclos_asleep_primary, ">=")
             return reasons
 
         # A2: Confirmatory asleep rule - PERCLOS ≥ 0.40 AND at least one confirmer
-        if perclos >= self.thresholds.perclos_asleep_confirm:
-            self._push_reason(reasons, seen, "perclos_15s", perclos, self.thresholds.perclos_asleep_confirm, ">=")
-            
-            confirmers = []
-            if droop_duty >= self.thresholds.droop_duty_asleep:
-                confirmers.append("droop")
-                self._push_reason(reasons, seen, "droop_duty_15s", droop_duty, self.thresholds.droop_duty_asleep, ">=")
-            
-            if pitch_max >= self.thresholds.pitchdown_asleep:
-                confirmers.append("pitch")
-                self._push_reason(reasons, seen, "pitchdown_max_15s", pitch_max, self.thresholds.pitchdown_asleep, ">=")
-            
-            if yawn_duty >= self.thresholds.yawn_duty_asleep:
-                confirmers.append("yawn_duty")
-                self._push_reason(reasons, seen, "yawn_duty_15s", yawn_duty, self.thresholds.yawn_duty_asleep, ">=")
-            
-            if yawn_count >= self.thresholds.yawn_count_threshold:
-                confirmers.append("yawn_count")
-                self._push_reason(reasons, seen, "yawn_count_15s", yawn_count, self.thresholds.yawn_count_threshold, ">=")
-            
+        if band == _BAND_A2:
+            self._push_reason(reasons, seen, self._perclos_rids[_BAND_A2], "perclos_15s", perclos, t.perclos_asleep_confirm, ">=")
+            confirmers = self._check_rules(signals, self._asleep_confirmer_rules, reasons, seen)
             if confirmers:
                 return reasons
 
         # A3: Broad confirmatory asleep rule - PERCLOS ≥ 0.35 AND two confirmers
-        if perclos >= self.thresholds.perclos_asleep_broad:
-            self._push_reason(reasons, seen, "perclos_15s", perclos, self.thresholds.perclos_asleep_broad, ">=")
-            
-            confirmers = []
-            if droop_duty >= self.thresholds.droop_duty_asleep:
-                confirmers.append("droop")
-                self._push_reason(reasons, seen, "droop_duty_15s", droop_duty, self.thresholds.droop_duty_asleep, ">=")
-            
-            if pitch_max >= self.thresholds.pitchdown_asleep:
-                confirmers.append("pitch")
-                self._push_reason(reasons, seen, "pitchdown_max_15s", pitch_max, self.thresholds.pitchdown_asleep, ">=")
-            
-            if yawn_duty >= self.thresholds.yawn_duty_asleep:
-                confirmers.append("yawn_duty")
-                self._push_reason(reasons, seen, "yawn_duty_15s", yawn_duty, self.thresholds.yawn_duty_asleep, ">=")
-            
-            if yawn_count >= self.thresholds.yawn_count_threshold:
-                confirmers.append("yawn_count")
-                self._push_reason(reasons, seen, "yawn_count_15s", yawn_count, self.thresholds.yawn_count_threshold, ">=")
-            
-            if len(confirmers) >= 2:
-                return reasons
+        self._push_reason(reasons, seen, self._perclos_rids[_BAND_A3], "perclos_15s", perclos, t.perclos_asleep_broad, ">=")
+        confirmers = self._check_rules(signals, self._asleep_confirmer_rules, reasons, seen)
+        if len(confirmers) >= 2:
+            return reasons
 
         # No asleep conditions met - clear reasons and return empty
         reasons.clear()
         return reasons
 
-    def _evaluate_drowsy(self, signals, seen):
+    def _evaluate_drowsy(self, signals: Signals, seen: set, band: int) -> list[StateReason]:
         """PERCLOS-first drowsy evaluation with supporting signals."""
         reasons: list[StateReason] = []
-        perclos = signals["perclos_15s"]
-        yawn_duty = signals["yawn_duty_15s"]
-        yawn_count = signals["yawn_count_15s"]
-        droop_duty = signals["droop_duty_15s"]
-        pitch_max = signals["pitchdown_max_15s"]
-
-        # D1: Primary drowsy rule - 0.25 ≤ PERCLOS < 0.50
-        if self.thresholds.perclos_drowsy_primary <= perclos < self.thresholds.perclos_asleep_primary:
-            self._push_reason(reasons, seen, "perclos_15s", perclos, self.thresholds.perclos_drowsy_primary, ">=")
+        if band > _BAND_D2:
+            return reasons
+
+        t = self.thresholds
+        perclos = signals.perclos_15s
+
+        # D1: Primary drowsy rule - 0.25 ≤ PERCLOS < 0.50 (A1 has already claimed higher values)
+        if band <= _BAND_D1:
+            self._push_reason(reasons, seen, self._perclos_rids[_BAND_D1], "perclos_15s", perclos, t.perclos_drowsy_primary, ">=")
             return reasons
 
         # D2: Assisted drowsy rule - 0.15 ≤ PERCLOS < 0.25 AND any supporter
-        if self.thresholds.perclos_drowsy_assist <= perclos < self.thresholds.perclos_drowsy_primary:
-            self._push_reason(reasons, seen, "perclos_15s", perclos, self.thresholds.perclos_drowsy_assist, ">=")
-            
-            supporters = []
-            if yawn_duty >= self.thresholds.yawn_duty_drowsy:
-                supporters.append("yawn_duty")
-                self._push_reason(reasons, seen, "yawn_duty_15s", yawn_duty, self.thresholds.yawn_duty_drowsy, ">=")
-            
-            if yawn_count >= self.thresholds.yawn_count_threshold:
-                supporters.append("yawn_count")
-                self._push_reason(reasons, seen, "yawn_count_15s", yawn_count, self.thresholds.yawn_count_threshold, ">=")
-            
-            if droop_duty >= self.thresholds.droop_duty_asleep:
-                supporters.append("droop")
-                self._push_reason(reasons, seen, "droop_duty_15s", droop_duty, self.thresholds.droop_duty_asleep, ">=")
-            
-            if pitch_max >= self.thresholds.pitchdown_drowsy:
-                supporters.append("pitch")
-                self._push_reason(reasons, seen, "pitchdown_max_15s", pitch_max, self.thresholds.pitchdown_drowsy, ">=")
-            
-            if supporters:
-                return reasons
+        self._push_reason(reasons, seen, self._perclos_rids[_BAND_D2], "perclos_15s", perclos, t.perclos_drowsy_assist, ">=")
+        supporters = self._check_rules(signals, self._drowsy_supporter_rules, reasons, seen)
+        if supporters:
+            return reasons
 
         # No drowsy conditions met - clear reasons and return empty
         reasons.clear()
         return reasons
 
-    def _evaluate_lucid(self, signals, seen):
+    def _evaluate_lucid(self, signals: Signals, seen: set, band: int) -> list[StateReason]:
         """Lucid evaluation with optional near-threshold warning."""
         reasons: list[StateReason] = []
-        perclos = signals["perclos_15s"]
         
         # Optional: Add near-threshold warning for values approaching drowsy range
-        if perclos >= self.thresholds.perclos_lucid_near:
-            self._push_reason(reasons, seen, "perclos_15s", perclos, self.thresholds.perclos_lucid_near, "near_threshold")
+        if band != _BAND_NONE:
+            self._push_reason(
+                reasons,
+                seen,
+                self._perclos_rids[_BAND_L_NEAR],
+                "perclos_15s",
+                signals.perclos_15s,
+                self.thresholds.perclos_lucid_near,
+                "near_threshold",
+            )
         
         return reasons
 
-    def _compute_risk(self, signals: dict) -> int:
+    def _compute_risk(self, signals: Signals) -> int:
         """Compute risk score heavily weighted toward PERCLOS (70/15/15 split)."""
-        def clamp01(value: float) -> float:
-            return max(0.0, min(1.0, value))
-
-        perclos = signals["perclos_15s"]
-        yawn_duty = signals["yawn_duty_15s"]
-        droop_duty = signals["droop_duty_15s"]
-
         # Normalize to 0-1 using the new risk scoring ranges
-        p = clamp01((perclos - self.thresholds.perclos_risk_min) / (self.thresholds.perclos_risk_max - self.thresholds.perclos_risk_min))
-        y = clamp01((yawn_duty - self.thresholds.yawn_risk_min) / (self.thresholds.yawn_risk_max - self.thresholds.yawn_risk_min))
-        d = clamp01((droop_duty - self.thresholds.droop_risk_min) / (self.thresholds.droop_risk_max - self.thresholds.droop_risk_min))
-        
+        p = (signals.perclos_15s - self._perclos_risk_min) * self._perclos_risk_inv
+        p = 0.0 if p < 0.0 else (1.0 if p > 1.0 else p)
+        y = (signals.yawn_duty_15s - self._yawn_risk_min) * self._yawn_risk_inv
+        y = 0.0 if y < 0.0 else (1.0 if y > 1.0 else y)
+        d = (signals.droop_duty_15s - self._droop_risk_min) * self._droop_risk_inv
+        d = 0.0 if d < 0.0 else (1.0 if d > 1.0 else d)
+
         # Weight: 70% PERCLOS, 15% yawn, 15% droop
-        score01 = 0.7 * p + 0.15 * y + 0.15 * d
-        return round(100 * score01)
+        return round(100 * (_RISK_W_PERCLOS * p + _RISK_W_YAWN * y + _RISK_W_DROOP * d))
 
-    def _apply_hysteresis(self, session_id: str, driver_id: str, raw_state: str, risk_score: int) -> str:
+    def _apply_hysteresis(self, key: str, raw_state: str, risk_score: int) -> str:
         """Apply PERCLOS-anchored hysteresis to reduce state flip-flop."""
-        now = datetime.now(timezone.utc)
-        key = (session_id, driver_id)
+        now = time.monotonic()
+        raw_sev = _STATE_TO_INT.get(raw_state, 0)
         entry = self._cache.get(key)
-        if entry and (now - entry.timestamp).total_seconds() > self.thresholds.hysteresis_seconds:
+        if entry is not None and now - entry[1] > self.thresholds.hysteresis_seconds:
             entry = None
-            self._cache.pop(key, None)
-
-        if not entry:
-            self._cache[key] = _StateCacheEntry(state=raw_state, timestamp=now, consecutive_lower=0)
-            return raw_state
 
-        prev_state = entry.state
-        severity = {"Lucid": 0, "Drowsy": 1, "Asleep": 2}
-        prev_sev = severity.get(prev_state, 0)
-        raw_sev = severity.get(raw_state, 0)
-
-        if raw_sev > prev_sev:
-            # Upgrading severity - allow immediately
-            final_state = raw_state
+        if entry is None:
+            final_sev = raw_sev
             consecutive = 0
-        elif raw_sev < prev_sev:
-            # Downgrading severity - require two consecutive buckets OR low risk
-            new_consecutive = entry.consecutive_lower + 1
-            allow = risk_score < 40 or new_consecutive >= 2
-            if allow:
-                final_state = raw_state
-                consecutive = 0
-            else:
-                final_state = prev_state
-                consecutive = new_consecutive
         else:
-            # Same severity
-            final_state = raw_state
-            consecutive = 0
-
-        self._cache[key] = _StateCacheEntry(state=final_state, timestamp=now, consecutive_lower=consecutive)
-        return final_state
+            prev_sev, _, prev_consecutive = entry
+            if raw_sev < prev_sev:
+                # Downgrading severity - require two consecutive buckets OR low risk
+                new_consecutive = prev_consecutive + 1
+                if risk_score < 40 or new_consecutive >= 2:
+                    final_sev = raw_sev
+                    consecutive = 0
+                else:
+                    final_sev = prev_sev
+                    consecutive = new_consecutive
+            else:
+                # Same or upgraded severity - allow immediately
+                final_sev = raw_sev
+                consecutive = 0
 
-    def _push_reason(self, reasons, seen, signal, value, threshold, relation):
-        key = (signal, relation, threshold)
-        if key in seen:
+        self._cache[key] = (final_sev, now, consecutive)
+        self._cache.move_to_end(key)
+        self._evict(now)
+        return _STATES[final_sev]
+
+    def _evict(self, now: float) -> None:
+        """Drop expired entries and enforce the size cap.
+
+        The cache is ordered by last update, so expired entries are always at
+        the front and eviction stops at the first live one.
+        """
+        cache = self._cache
+        ttl = self.thresholds.hysteresis_seconds
+        while cache:
+            key, entry = next(iter(cache.items()))
+            if now - entry[1] <= ttl and len(cache) <= MAX_TRACKED_DRIVERS:
+                break
+            del cache[key]
+            self._last_logged_state.pop(key, None)
+
+    def _check_rules(self, signals: Signals, rules, reasons: list[StateReason], seen: set) -> list[str]:
+        """Return the tags of rules whose signal meets its threshold, recording a reason for each."""
+        hits = []
+        for field, threshold, tag, reason_id in rules:
+            value = getattr(signals, field)
+            if value >= threshold:
+                hits.append(tag)
+                self._push_reason(reasons, seen, reason_id, field, value, threshold, ">=")
+        return hits
+
+    def _push_reason(self, reasons, seen, reason_id, signal, value, threshold, relation):
+        if reason_id in seen:
             return
-        seen.add(key)
-        reasons.append(
-            StateReason(
-                signal=signal,
-                value=value,
-                threshold=threshold,
-                relation=relation,
-            )
-        )
+        seen.add(reason_id)
+        reasons.append(_make_reason(signal, value, threshold, relation))
@@ -2,11 +2,17 @@
 
 from __future__ import annotations
 
+import threading
 from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
-from typing import Dict, Tuple
+from typing import Dict, List
 
 from .models import StateResponse
+from .utils import driver_key
+
+# Power of two so the shard index is a mask of the key's (cached) string hash.
+N_SHARDS = 16
+_SHARD_MASK = N_SHARDS - 1
 
 
 @dataclass
@@ -20,32 +26,52 @@ class StateRecord:
 
 class StateStore:
     def __init__(self):
-        self._records: Dict[Tuple[str, str], StateRecord] = {}
+        # Sharded so concurrent recorders only contend on drivers that hash
+        # to the same shard.
+        self._shards: List[Dict[str, StateRecord]] = [{} for _ in range(N_SHARDS)]
+        self._locks: List[threading.Lock] = [threading.Lock() for _ in range(N_SHARDS)]
+
+    @staticmethod
+    def _shard(key: str) -> int:
+        return hash(key) & _SHARD_MASK
 
-    def record(self, response: StateResponse) -> None:
-        key = (response.session_id, response.driver_id)
-        self._records[key] = StateRecord(
+    def record(self, response: StateResponse, now_utc: datetime | None = None) -> None:
+        key = driver_key(response.session_id, response.driver_id)
+        entry = StateRecord(
             ts_end=response.ts_end,
             state=response.state,
             confidence=response.state_confidence,
             payload=response,
-            stored_at=datetime.now(timezone.utc),
+            stored_at=now_utc or datetime.now(timezone.utc),
         )
+        index = self._shard(key)
+        with self._locks[index]:
+            self._shards[index][key] = entry
 
-    def latest(self, session_id: str, driver_id: str, max_age_seconds: int = 120) -> StateRecord | None:
-        key = (session_id, driver_id)
-        record = self._records.get(key)
+    def latest(
+        self,
+        session_id: str,
+        driver_id: str,
+        max_age_seconds: int = 120,
+        now_utc: datetime | None = None,
+    ) -> StateRecord | None:
+        key = driver_key(session_id, driver_id)
+        index = self._shard(key)
+        with self._locks[index]:
+            record = self._shards[index].get(key)
         if not record:
             return None
         max_age = timedelta(seconds=max_age_seconds)
-        now = datetime.now(timezone.utc)
+        now = now_utc or datetime.now(timezone.utc)
         stored_ts = record.stored_at
         if now - stored_ts > max_age:
             return None
         return record
 
     def clear(self):
-        self._records.clear()
+        for lock, shard in zip(self._locks, self._shards):
+            with lock:
+                shard.clear()
 
 
 GLOBAL_STATE_STORE = StateStore()
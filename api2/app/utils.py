@@ -1,17 +1,41 @@
 from __future__ import annotations
 
 import json
+import logging
+import os
+import re
+import shutil
 import subprocess
+import sys
 from datetime import datetime, timedelta, timezone
+from functools import lru_cache
 from pathlib import Path
 from typing import Union
 
 
 TimestampInput = Union[str, float, int]
 
+logger = logging.getLogger("lucid.window")
+
+# [[HH:]MM:]SS[.fff] with at least one colon; plain seconds go through float().
+_TIMECODE_RE = re.compile(r"^(?:(\d+(?:\.\d+)?):)?(\d+(?:\.\d+)?):(\d+(?:\.\d+)?)$")
+
+# Resolved once; when ffprobe isn't installed we skip the probe without forking.
+_FFPROBE = shutil.which("ffprobe")
+
+
+def driver_key(session_id: str, driver_id: str) -> str:
+    """Interned single-string key for per-(session, driver) lookups.
+
+    Interning means repeat requests hit dicts with an identical object whose
+    hash is already cached, instead of hashing a fresh tuple each time.
+    """
+    return sys.intern(f"{session_id}\x1f{driver_id}")
+
 
 def clamp(value: float, lower: float, upper: float) -> float:
-    return max(lower, min(upper, value))
+    # Conditional form of max(lower, min(upper, value)); NaN still maps to upper.
+    return value if lower <= value <= upper else (lower if value < lower else upper)
 
 
 def parse_timestamp(value: TimestampInput) -> float:
@@ -36,46 +60,59 @@ def parse_timestamp(value: TimestampInput) -> float:
         pass
 
     if ":" in value:
-        parts = value.split(":")
-        if len(parts) > 3:
+        match = _TIMECODE_RE.match(value)
+        if not match:
             raise ValueError(f"invalid timecode: {value}")
-        seconds = 0.0
-        for part in parts:
-            if not part:
-                raise ValueError(f"invalid timecode: {value}")
-            seconds = seconds * 60 + float(part)
-        if seconds < 0:
-            raise ValueError
+        hours, minutes, secs = match.groups()
+        seconds = float(minutes) * 60 + float(secs)
+        if hours:
+            seconds += float(hours) * 3600
         return seconds
 
     raise ValueError(f"unable to parse timestamp '{value}'")
 
 
 def probe_creation_time(path: Union[str, Path]) -> datetime | None:
-    """Use ffprobe (if available) to pull the recording start time."""
+    """Use ffprobe (if available) to pull the recording start time.
+
+    Results are cached per (path, mtime, size), so repeated windows of the
+    same video don't each spawn an ffprobe process.
+    """
+
+    if _FFPROBE is None:
+        return None
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return _probe_creation_time_cached(os.path.realpath(path), st.st_mtime_ns, st.st_size)
+
 
+@lru_cache(maxsize=256)
+def _probe_creation_time_cached(path: str, mtime_ns: int, size: int) -> datetime | None:
     cmd = [
-        "ffprobe",
+        _FFPROBE,
         "-v",
         "quiet",
         "-print_format",
         "json",
         "-show_format",
-        str(path),
+        path,
     ]
     try:
         result = subprocess.run(
             cmd,
+            stdin=subprocess.DEVNULL,
             capture_output=True,
             check=True,
-            text=True,
         )
     except (FileNotFoundError, subprocess.CalledProcessError):
         return None
 
     try:
+        # json.loads takes the raw bytes and detects UTF-8 itself.
         payload = json.loads(result.stdout)
-    except json.JSONDecodeError:
+    except (json.JSONDecodeError, UnicodeDecodeError):
         return None
 
     creation_raw = payload.get("format", {}).get("tags", {}).get("creation_time")
@@ -91,29 +128,28 @@ def probe_creation_time(path: Union[str, Path]) -> datetime | None:
 
 
 def window_bounds(duration: float | None, ts_end: float, window_seconds: float) -> tuple[float, float]:
-    print(f"[WindowBounds] Processing timestamp {ts_end}s, duration={duration}s, window={window_seconds}s")
+    logger.debug("Processing timestamp %ss, duration=%ss, window=%ss", ts_end, duration, window_seconds)
     
     if duration and duration > 0 and ts_end > duration:
-        print(f"[WindowBounds] ERROR: timestamp {ts_end}s exceeds video duration {duration}s")
         raise ValueError(
             f"timestamp {ts_end:.2f}s exceeds video duration {duration:.2f}s"
         )
     
     start = ts_end - window_seconds
-    print(f"[WindowBounds] Calculated start={start}s, end={ts_end}s")
+    logger.debug("Calculated start=%ss, end=%ss", start, ts_end)
     
     if start < 0:
         # For demo purposes, when we don't have enough history, start from beginning
         # This handles the video loop case where timestamps < 15s are requested
-        print(f"[WindowBounds] Adjusting window for timestamp {ts_end}s: using 0s-{ts_end}s instead of {start}s-{ts_end}s")
+        logger.debug("Adjusting window for timestamp %ss: using 0s-%ss instead of %ss-%ss", ts_end, ts_end, start, ts_end)
         start = 0.0
         # If the available window is too short, extend to minimum viable window
         if ts_end < 5.0:  # Need at least 5 seconds for meaningful analysis
             old_ts_end = ts_end
             ts_end = min(5.0, duration or 5.0)
-            print(f"[WindowBounds] Extended short window: {old_ts_end}s -> {ts_end}s")
+            logger.debug("Extended short window: %ss -> %ss", old_ts_end, ts_end)
     
-    print(f"[WindowBounds] Final window: {start}s to {ts_end}s")
+    logger.debug("Final window: %ss to %ss", start, ts_end)
     return start, ts_end
 
 
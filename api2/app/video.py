@@ -2,6 +2,9 @@
 
 from __future__ import annotations
 
+import os
+import threading
+from functools import lru_cache
 from pathlib import Path
 from typing import Any, Iterator, Tuple
 
@@ -10,52 +13,120 @@ import cv2
 from .models import StreamMeta
 
 
+@lru_cache(maxsize=128)
+def _inspect_meta(path: str, mtime_ns: int, size: int) -> StreamMeta:
+    """Read stream metadata; cached per file identity so repeat opens are free."""
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise ValueError(f"unable to open video at {path}")
+
+    fps = cap.get(cv2.CAP_PROP_FPS) or 0.0
+    if fps <= 0:
+        fps = 30.0
+    raw_frame_count = cap.get(cv2.CAP_PROP_FRAME_COUNT)
+    frame_count = int(raw_frame_count) if raw_frame_count and raw_frame_count > 0 else 0
+    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)) or 0
+    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)) or 0
+    duration = (frame_count / fps) if frame_count > 0 else None
+    cap.release()
+
+    return StreamMeta(
+        fps=fps,
+        frame_count=frame_count,
+        duration=duration,
+        width=width,
+        height=height,
+    )
+
+
 class VideoWindowExtractor:
     def __init__(self, path: str | Path):
         self.path = str(path)
         self.meta = self._inspect()
+        # Opened lazily so metadata-only callers never pay for a capture. One
+        # idle capture is kept between window reads and handed to the next
+        # one; a read that finds it taken opens its own. The lock only guards
+        # that hand-off, never a read in progress.
+        self._idle_cap: cv2.VideoCapture | None = None
+        self._busy_caps: set[cv2.VideoCapture] = set()
+        self._lock = threading.Lock()
 
-    def _inspect(self) -> StreamMeta:
-        cap = cv2.VideoCapture(self.path)
-        if not cap.isOpened():
-            raise ValueError(f"unable to open video at {self.path}")
-
-        fps = cap.get(cv2.CAP_PROP_FPS) or 0.0
-        if fps <= 0:
-            fps = 30.0
-        raw_frame_count = cap.get(cv2.CAP_PROP_FRAME_COUNT)
-        frame_count = int(raw_frame_count) if raw_frame_count and raw_frame_count > 0 else 0
-        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)) or 0
-        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)) or 0
-        duration = (frame_count / fps) if frame_count > 0 else None
+    def __enter__(self) -> "VideoWindowExtractor":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Release every capture, including ones held by unfinished windows."""
+        with self._lock:
+            caps = list(self._busy_caps)
+            if self._idle_cap is not None:
+                caps.append(self._idle_cap)
+            self._idle_cap = None
+            self._busy_caps.clear()
+        for cap in caps:
+            cap.release()
+
+    def _checkout(self) -> cv2.VideoCapture:
+        with self._lock:
+            cap, self._idle_cap = self._idle_cap, None
+        if cap is None:
+            cap = cv2.VideoCapture(self.path)
+            if not cap.isOpened():
+                cap.release()
+                raise ValueError(f"unable to open video at {self.path}")
+        with self._lock:
+            self._busy_caps.add(cap)
+        return cap
+
+    def _checkin(self, cap: cv2.VideoCapture) -> None:
+        with self._lock:
+            if cap not in self._busy_caps:
+                # close() already released it.
+                return
+            self._busy_caps.discard(cap)
+            if self._idle_cap is None:
+                self._idle_cap = cap
+                return
         cap.release()
 
-        return StreamMeta(
-            fps=fps,
-            frame_count=frame_count,
-            duration=duration,
-            width=width,
-            height=height,
-        )
+    def _inspect(self) -> StreamMeta:
+        try:
+            st = os.stat(self.path)
+        except OSError as exc:
+            raise ValueError(f"unable to open video at {self.path}") from exc
+        return _inspect_meta(self.path, st.st_mtime_ns, st.st_size)
 
-    def iter_window(self, start: float, end: float) -> Iterator[Tuple[float, Any]]:
-        cap = cv2.VideoCapture(self.path)
-        if not cap.isOpened():
-            raise ValueError(f"unable to open video at {self.path}")
+    def iter_window(self, start: float, end: float, copy: bool = False) -> Iterator[Tuple[float, Any]]:
+        """Yield ``(time, rgb_frame)`` pairs covering ``[start, end]``.
 
+        Decode and colour-conversion buffers are reused across frames, so the
+        yielded array is only valid until the next iteration. Pass
+        ``copy=True`` to get an owned array per frame instead. Windows may be
+        read concurrently or interleaved; each one uses its own capture while
+        it is being iterated.
+        """
         fps = self.meta.fps or 30.0
-        # Try to seek directly; if it fails, fall back to manual skip
-        cap.set(cv2.CAP_PROP_POS_MSEC, max(0, start) * 1000)
-
-        current_time = start
-        frame_index = 0
-        while current_time <= end:
-            success, frame = cap.read()
-            if not success:
-                break
-            rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            yield current_time, rgb
-            frame_index += 1
-            current_time = start + frame_index / fps
+        inv_fps = 1.0 / fps
 
-        cap.release()
+        # Frames at start + i / fps that fall inside [start, end]; the epsilon
+        # keeps an exact boundary frame from being lost to rounding.
+        frame_total = max(0, int((end - start) * fps + 1e-9) + 1) if end >= start else 0
+        frame = None
+        rgb = None
+        cap = self._checkout()
+        try:
+            # Integer frame seek; rounds like the backend does for POS_MSEC.
+            cap.set(cv2.CAP_PROP_POS_FRAMES, int(round(max(0.0, start) * fps)))
+            for frame_index in range(frame_total):
+                success, frame = cap.read(frame)
+                if not success:
+                    break
+                if rgb is not None:
+                    # Consumers may mark the frame read-only (e.g. for MediaPipe).
+                    rgb.flags.writeable = True
+                rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=rgb)
+                yield start + frame_index * inv_fps, (rgb.copy() if copy else rgb)
+        finally:
+            self._checkin(cap)
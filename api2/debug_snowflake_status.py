@@ -124,10 +124,7 @@ def test_snowflake_status_table():
         from app import snowflake_db
         
         try:
-            app_rows = snowflake_db.execute(
-                "INSERT INTO STATUS_TABLE (STATUS, TIME_CREATED) VALUES (%s, CURRENT_TIMESTAMP())",
-                ("DROWSY_SOON",)
-            )
+            app_rows = snowflake_db.insert_status_batch(["DROWSY_SOON", "ASLEEP", "OK"])
             print(f"✅ App integration test successful (rows: {app_rows})")
         except Exception as app_error:
             print(f"❌ App integration test failed: {app_error}")
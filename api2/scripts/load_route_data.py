@@ -15,10 +15,17 @@ from __future__ import annotations
 
 import argparse
 import csv
+import gzip
 import hashlib
+import os
+import tempfile
 from datetime import datetime, timezone
+from functools import lru_cache, partial
+from itertools import islice
+from multiprocessing import Pool
+from operator import attrgetter
 from pathlib import Path
-from typing import Any, Iterable
+from typing import Any, Iterable, Iterator, Sequence
 
 from app import snowflake_db
 from app.models import StateRequest
@@ -45,6 +52,39 @@ CREATE TABLE IF NOT EXISTS ROUTE_WINDOW_METRICS (
 )
 """
 
+ROUTE_STAGE = "route_stage"
+ROUTE_STAGE_SQL = f"""
+CREATE TEMPORARY STAGE IF NOT EXISTS {ROUTE_STAGE}
+    FILE_FORMAT=(TYPE=CSV COMPRESSION=GZIP FIELD_OPTIONALLY_ENCLOSED_BY='"' NULL_IF=(''))
+"""
+
+WINDOW_COLUMNS = (
+    "route_id",
+    "driver_id",
+    "window_ts",
+    "perclos_30s",
+    "pitchdown_avg_30s",
+    "pitchdown_max_30s",
+    "droop_time_30s",
+    "droop_duty_30s",
+    "yawn_count_30s",
+    "yawn_time_30s",
+    "yawn_duty_30s",
+    "yawn_peak_30s",
+    "driver_state",
+    "risk_score",
+)
+
+ROUTE_COLUMNS = (
+    "route_id",
+    "route_length_km",
+    "visibility_avg_km",
+    "elevation_change_m",
+    "intersection_count",
+    "nighttime_proportion",
+    "rest_stops_per_100km",
+)
+
 ROUTE_TABLE_SQL = """
 CREATE TABLE IF NOT EXISTS ROUTE_CHARACTERISTICS (
     route_id STRING,
@@ -65,173 +105,288 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument("--routes", required=True, help="Path to route_characteristics.csv")
     parser.add_argument("--truncate", action="store_true", help="Truncate destination tables before insert.")
     parser.add_argument("--max-rows", type=int, default=None, help="Optional cap on rows for quick tests.")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Processes used to classify rows (default: all cores, 1 = in-process).",
+    )
+    parser.add_argument(
+        "--loader",
+        choices=("copy", "pandas"),
+        default="copy",
+        help="Telemetry load path: gzip CSV + COPY INTO, or write_pandas (needs pandas + pyarrow).",
+    )
     return parser.parse_args()
 
 
-def read_csv(path: Path) -> list[dict[str, str]]:
+def iter_csv(path: Path) -> Iterator[dict[str, str]]:
+    """Yield CSV rows one at a time; the file stays open until exhausted."""
     with path.open("r", encoding="utf-8") as fh:
-        reader = csv.DictReader(fh)
-        return [row for row in reader]
+        yield from csv.DictReader(fh)
+
+
+@lru_cache(maxsize=None)
+def _route_index(driver_id: str, route_count: int) -> int:
+    # Same value as int(hexdigest, 16) without the hex round trip, so drivers
+    # keep the routes they were assigned by earlier loads.
+    digest = hashlib.sha256(driver_id.encode("utf-8")).digest()
+    return int.from_bytes(digest, "big") % route_count
 
 
 def stable_route_for_driver(driver_id: str, route_ids: list[str]) -> str:
-    digest = hashlib.sha256(driver_id.encode("utf-8")).hexdigest()
-    idx = int(digest, 16) % len(route_ids)
-    return route_ids[idx]
+    # Drivers repeat across windows and batches; each one is hashed once.
+    return route_ids[_route_index(driver_id, len(route_ids))]
+
+
+try:
+    # C parser; handles the trailing "Z" itself.
+    from ciso8601 import parse_datetime as _parse_iso
+except ImportError:
+
+    def _parse_iso(value: str) -> datetime:
+        return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+# StateRequest field <- source CSV column. The export still names the
+# windows *_30S; they carry the same per-window aggregates the model calls *_15s.
+_FLOAT_COLUMNS = (
+    ("perclos_15s", "PERCLOS_30S"),
+    ("pitchdown_avg_15s", "PITCHDOWN_AVG_30S"),
+    ("pitchdown_max_15s", "PITCHDOWN_MAX_30S"),
+    ("droop_time_15s", "DROOP_TIME_30S"),
+    ("droop_duty_15s", "DROOP_DUTY_30S"),
+    ("yawn_time_15s", "YAWN_TIME_30S"),
+    ("yawn_duty_15s", "YAWN_DUTY_30S"),
+    ("yawn_peak_15s", "YAWN_PEAK_30S"),
+)
+_INT_COLUMNS = (("yawn_count_15s", "YAWN_COUNT_30S"),)
+_MISSING = frozenset((None, "", "null"))
 
 
 def to_state_request(row: dict[str, str], session_id: str) -> StateRequest:
-    ts_raw = row["TIMESTAMP"]
-    ts_str = ts_raw.replace("Z", "+00:00")
-    ts = datetime.fromisoformat(ts_str)
-    if ts.tzinfo is None:
-        ts = ts.replace(tzinfo=timezone.utc)
-    else:
-        ts = ts.astimezone(timezone.utc)
-
-    def _float(key: str, default: float = 0.0) -> float:
-        value = row.get(key)
-        if value in (None, "", "null"):
-            return default
-        return float(value)
-
-    def _int(key: str, default: int = 0) -> int:
-        value = row.get(key)
-        if value in (None, "", "null"):
-            return default
-        return int(float(value))
-
-    return StateRequest(
+    ts = _parse_iso(row["TIMESTAMP"])
+    ts = ts.replace(tzinfo=timezone.utc) if ts.tzinfo is None else ts.astimezone(timezone.utc)
+
+    fields: dict[str, Any] = {
+        field: 0.0 if (value := row.get(column)) in _MISSING else float(value)
+        for field, column in _FLOAT_COLUMNS
+    }
+    for field, column in _INT_COLUMNS:
+        value = row.get(column)
+        fields[field] = 0 if value in _MISSING else int(float(value))
+
+    # Every value is already coerced to its field type, so skip validation.
+    return StateRequest.model_construct(
         ts_end=ts,
         session_id=session_id,
         driver_id=row["DRIVER_ID"],
-        perclos_30s=_float("PERCLOS_30S"),
         ear_thresh_T=0.2,
-        pitchdown_avg_30s=_float("PITCHDOWN_AVG_30S"),
-        pitchdown_max_30s=_float("PITCHDOWN_MAX_30S"),
-        droop_time_30s=_float("DROOP_TIME_30S"),
-        droop_duty_30s=_float("DROOP_DUTY_30S"),
         pitch_thresh_Tp=20.0,
-        yawn_count_30s=_int("YAWN_COUNT_30S"),
-        yawn_time_30s=_float("YAWN_TIME_30S"),
-        yawn_duty_30s=_float("YAWN_DUTY_30S"),
-        yawn_peak_30s=_float("YAWN_PEAK_30S"),
         confidence="OK",
         fps=30.0,
+        **fields,
+    )
+
+
+def _csv_value(value: Any) -> Any:
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def stage_and_copy(cur: Any, table: str, columns: Sequence[str], rows: Iterable[Sequence[Any]]) -> int:
+    """Write rows to a gzip CSV, PUT it on the session stage and COPY it into table.
+
+    One PUT + COPY replaces a bound INSERT round trip per batch. Returns the
+    number of rows written.
+    """
+    count = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / f"{table.lower()}.csv.gz"
+        with gzip.open(path, "wt", encoding="utf-8", newline="") as fh:
+            writer = csv.writer(fh)
+            for row in rows:
+                writer.writerow([_csv_value(value) for value in row])
+                count += 1
+        if not count:
+            return 0
+        cur.execute(f"PUT file://{path.as_posix()} @{ROUTE_STAGE} AUTO_COMPRESS=FALSE PARALLEL=8")
+        cur.execute(
+            f"COPY INTO {table} ({', '.join(columns)}) FROM @{ROUTE_STAGE} "
+            f"FILES=('{path.name}') PURGE=TRUE"
+        )
+    return count
+
+
+def write_pandas_rows(conn: Any, table: str, columns: Sequence[str], rows: Sequence[Sequence[Any]]) -> int:
+    """Bulk-load rows with write_pandas, which stages Parquet and runs COPY INTO."""
+    try:
+        import pandas as pd
+        from snowflake.connector.pandas_tools import write_pandas
+    except ImportError:
+        raise SystemExit("--loader pandas needs: pip install 'snowflake-connector-python[pandas]'")
+
+    if not rows:
+        return 0
+    df = pd.DataFrame.from_records(rows, columns=list(columns))
+    # ISO strings cast cleanly into TIMESTAMP_TZ on every connector version;
+    # tz-aware datetime columns need use_logical_type, which 3.0.x lacks.
+    df["window_ts"] = pd.to_datetime(df["window_ts"], utc=True).map(lambda ts: ts.isoformat())
+    success, _, nrows, _ = write_pandas(
+        conn,
+        df,
+        table,
+        chunk_size=100_000,
+        compression="snappy",
+        parallel=4,
+        quote_identifiers=False,
     )
+    if not success:
+        raise RuntimeError(f"write_pandas into {table} did not succeed")
+    return nrows
+
+
+# WINDOW_COLUMNS[1:12] in order. to_state_request already defaults every
+# numeric field, so no None checks are needed here.
+_payload_fields = attrgetter(
+    "driver_id",
+    "ts_end",
+    "perclos_15s",
+    "pitchdown_avg_15s",
+    "pitchdown_max_15s",
+    "droop_time_15s",
+    "droop_duty_15s",
+    "yawn_count_15s",
+    "yawn_time_15s",
+    "yawn_duty_15s",
+    "yawn_peak_15s",
+)
+
+_worker_classifier: DriverStateClassifier | None = None
+
+
+def _init_worker() -> None:
+    global _worker_classifier
+    _worker_classifier = DriverStateClassifier()
+
+
+def build_driver_payloads(rows: list[dict[str, str]], route_ids: list[str]) -> list[tuple[Any, ...]]:
+    """Classify one driver's rows in order and return ROUTE_WINDOW_METRICS tuples."""
+    route_id = stable_route_for_driver(rows[0]["DRIVER_ID"], route_ids)
+    requests = [to_state_request(row, f"{row['DRIVER_ID']}::{route_id}") for row in rows]
+    states = _worker_classifier.classify_batch(requests)
+    return [
+        (route_id, *_payload_fields(request), state.state, state.risk_score)
+        for request, state in zip(requests, states)
+    ]
 
 
 def chunked(iterable: Iterable[Any], size: int) -> Iterable[list[Any]]:
-    batch: list[Any] = []
-    for item in iterable:
-        batch.append(item)
-        if len(batch) >= size:
-            yield batch
-            batch = []
-    if batch:
+    it = iter(iterable)
+    while batch := list(islice(it, size)):
         yield batch
 
 
+def iter_payloads(
+    rows: Iterable[dict[str, str]],
+    route_ids: list[str],
+    workers: int | None,
+    batch_size: int = 10_000,
+) -> Iterator[tuple[Any, ...]]:
+    """Classify streamed window rows batch by batch and yield payload tuples.
+
+    Hysteresis is per driver, so a driver's rows must be classified in order
+    by one classifier. Each driver is pinned to a single-process pool (FIFO),
+    which keeps its state across batches while different drivers run in
+    parallel. Only one batch is in flight at a time.
+    """
+    build = partial(build_driver_payloads, route_ids=route_ids)
+    workers = workers or os.cpu_count() or 1
+    pools = [Pool(1, initializer=_init_worker) for _ in range(workers)] if workers > 1 else []
+    if not pools:
+        _init_worker()
+    try:
+        for batch in chunked(rows, batch_size):
+            by_driver: dict[str, list[dict[str, str]]] = {}
+            for row in batch:
+                by_driver.setdefault(row["DRIVER_ID"], []).append(row)
+            if not pools:
+                for group in by_driver.values():
+                    yield from build(group)
+                continue
+            pending = [
+                pools[hash(driver_id) % len(pools)].apply_async(build, (group,))
+                for driver_id, group in by_driver.items()
+            ]
+            for result in pending:
+                yield from result.get()
+    finally:
+        for pool in pools:
+            pool.terminate()
+
+
 def main() -> None:
     args = parse_args()
     windows_path = Path(args.windows).expanduser()
     routes_path = Path(args.routes).expanduser()
 
-    window_rows = read_csv(windows_path)
-    route_rows = read_csv(routes_path)
+    route_rows = list(iter_csv(routes_path))
+    window_rows: Iterable[dict[str, str]] = iter_csv(windows_path)
     if args.max_rows:
-        window_rows = window_rows[: args.max_rows]
+        window_rows = islice(window_rows, args.max_rows)
 
     route_ids = [row["ROUTE_ID"] for row in route_rows]
     if not route_ids:
         raise SystemExit("route_characteristics.csv did not contain any rows.")
-    classifier = DriverStateClassifier()
-
-    telemetry_payloads = []
-    for row in window_rows:
-        driver_id = row["DRIVER_ID"]
-        route_id = stable_route_for_driver(driver_id, route_ids)
-        session_id = f"{driver_id}::{route_id}"
-        request = to_state_request(row, session_id)
-        state = classifier.classify(request)
-        telemetry_payloads.append(
-            (
-                route_id,
-                driver_id,
-                request.ts_end,
-                request.perclos_15s or 0.0,
-                request.pitchdown_avg_15s or 0.0,
-                request.pitchdown_max_15s or 0.0,
-                request.droop_time_15s or 0.0,
-                request.droop_duty_15s or 0.0,
-                request.yawn_count_15s or 0,
-                request.yawn_time_15s or 0.0,
-                request.yawn_duty_15s or 0.0,
-                request.yawn_peak_15s or 0.0,
-                state.state,
-                state.risk_score,
-            )
-        )
-
-    conn = snowflake_db.get_conn()
-    cur = conn.cursor()
-    try:
-        cur.execute(ROUTE_TABLE_SQL)
-        cur.execute(WINDOW_TABLE_SQL)
-        if args.truncate:
-            cur.execute("TRUNCATE TABLE ROUTE_CHARACTERISTICS")
-            cur.execute("TRUNCATE TABLE ROUTE_WINDOW_METRICS")
-
-        route_insert_sql = """
-            INSERT INTO ROUTE_CHARACTERISTICS
-            (route_id, route_length_km, visibility_avg_km, elevation_change_m, intersection_count, nighttime_proportion, rest_stops_per_100km)
-            VALUES (%s,%s,%s,%s,%s,%s,%s)
-        """
-        route_payloads = [
-            (
-                row["ROUTE_ID"],
-                float(row.get("ROUTE_LENGTH_KM", 0) or 0),
-                float(row.get("VISIBILITY_AVG_KM", 0) or 0),
-                float(row.get("ELEVATION_CHANGE_M", 0) or 0),
-                float(row.get("INTERSECTION_COUNT", 0) or 0),
-                float(row.get("NIGHTTIME_PROPORTION", 0) or 0),
-                float(row.get("REST_STOPS_PER_100KM", 0) or 0),
-            )
-            for row in route_rows
-        ]
-        if route_payloads:
-            cur.execute("TRUNCATE TABLE ROUTE_CHARACTERISTICS")
-            cur.executemany(route_insert_sql, route_payloads)
-            print(f"[Snowflake] Loaded {len(route_payloads)} route definitions.")
-
-        window_insert_sql = """
-            INSERT INTO ROUTE_WINDOW_METRICS (
-                route_id,
-                driver_id,
-                window_ts,
-                perclos_30s,
-                pitchdown_avg_30s,
-                pitchdown_max_30s,
-                droop_time_30s,
-                droop_duty_30s,
-                yawn_count_30s,
-                yawn_time_30s,
-                yawn_duty_30s,
-                yawn_peak_30s,
-                driver_state,
-                risk_score
-            ) VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)
-        """
-        inserted = 0
-        for batch in chunked(telemetry_payloads, 200):
-            cur.executemany(window_insert_sql, batch)
-            inserted += len(batch)
-        print(f"[Snowflake] Inserted {inserted} telemetry windows across {len(route_ids)} routes.")
-
-        conn.commit()
-    finally:
-        cur.close()
-        conn.close()
+    telemetry_payloads = iter_payloads(window_rows, route_ids, args.workers)
+
+    # Pooled write session: in a long-lived process (notebook, repeated
+    # main() calls) later runs skip the login and warehouse resume.
+    with snowflake_db.pooled_connection() as conn:
+        cur = conn.cursor()
+        try:
+            cur.execute(ROUTE_TABLE_SQL)
+            cur.execute(WINDOW_TABLE_SQL)
+            if args.truncate:
+                cur.execute("TRUNCATE TABLE ROUTE_CHARACTERISTICS")
+                cur.execute("TRUNCATE TABLE ROUTE_WINDOW_METRICS")
+
+            cur.execute(ROUTE_STAGE_SQL)
+
+            route_payloads = [
+                (
+                    row["ROUTE_ID"],
+                    float(row.get("ROUTE_LENGTH_KM", 0) or 0),
+                    float(row.get("VISIBILITY_AVG_KM", 0) or 0),
+                    float(row.get("ELEVATION_CHANGE_M", 0) or 0),
+                    float(row.get("INTERSECTION_COUNT", 0) or 0),
+                    float(row.get("NIGHTTIME_PROPORTION", 0) or 0),
+                    float(row.get("REST_STOPS_PER_100KM", 0) or 0),
+                )
+                for row in route_rows
+            ]
+            if route_payloads:
+                cur.execute("TRUNCATE TABLE ROUTE_CHARACTERISTICS")
+                # A few hundred rows: one multi-row INSERT beats a PUT + COPY.
+                placeholders = ",".join([f"({','.join(['%s'] * len(ROUTE_COLUMNS))})"] * len(route_payloads))
+                cur.execute(
+                    f"INSERT INTO ROUTE_CHARACTERISTICS ({', '.join(ROUTE_COLUMNS)}) VALUES {placeholders}",
+                    [value for row in route_payloads for value in row],
+                )
+                print(f"[Snowflake] Loaded {len(route_payloads)} route definitions.")
+
+            if args.loader == "pandas":
+                inserted = write_pandas_rows(conn, "ROUTE_WINDOW_METRICS", WINDOW_COLUMNS, list(telemetry_payloads))
+            else:
+                inserted = stage_and_copy(cur, "ROUTE_WINDOW_METRICS", WINDOW_COLUMNS, telemetry_payloads)
+            print(f"[Snowflake] Inserted {inserted} telemetry windows across {len(route_ids)} routes.")
+
+            conn.commit()
+        finally:
+            cur.close()
 
 
 if __name__ == "__main__":
@@ -2,14 +2,15 @@
 
 This script connects to Snowflake (using env vars or .env), then finds all video
 files in `api2/videos/` and, for each file, posts three analysis requests to
-`/api/window` at timestamps 30, 60 and 90 seconds. For each successful analysis
-response the script inserts a row into
-`DROWSINESS_MEASUREMENTS` with columns:
-  - driver_id (file stem)
-  - measured_at (current UTC timestamp)
-  - perclos_30s, pitchdown_avg_30s, pitchdown_max_30s,
-    droop_time_30s, droop_duty_30s,
-    yawn_count_30s, yawn_time_30s, yawn_duty_30s, yawn_peak_30s
+`/api/window` at timestamps 30, 60 and 90 seconds. Each successful analysis
+response becomes one row, and all rows are bulk-loaded into
+`DROWSINESS_MEASUREMENTS` (see MEASUREMENT_COLUMNS) with columns:
+  - driver_id (response driver_id, else the file's truck id)
+  - session_id (response session_id, else "<truck id>_<file stem>")
+  - ts (response ts_end, else the UTC time the run started)
+  - perclos, perclos_percent, ear_threshold,
+    pitchdown_avg, pitchdown_max, droop_time, droop_duty, pitch_threshold,
+    yawn_count, yawn_time, yawn_duty, yawn_peak, confidence, fps
 
 Usage (PowerShell):
   $env:SNOWFLAKE_USER = "FAWAZSABIR"
@@ -18,35 +19,59 @@ Usage (PowerShell):
   $env:SNOWFLAKE_WAREHOUSE = "COMPUTE_WH"
   python .\scripts\test_snowflake.py
 
-You can override the upload target with API_BASE_URL (default http://localhost:8000).
+You can override the upload target with API_BASE_URL (default http://localhost:8000)
+and the number of concurrent uploads with UPLOAD_WORKERS (default 8).
 """
 
 from __future__ import annotations
 
+import csv
+import gzip
+import importlib.util
+import io
+import json
+import mmap
 import os
 import sys
-<<<<<<< Updated upstream
-from datetime import datetime, timezone
-=======
-import json
 import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from functools import lru_cache
 from pathlib import Path
-from datetime import datetime
->>>>>>> Stashed changes
 from typing import Any
 
 try:
     import dotenv
-    dotenv.load_dotenv()
 except Exception:
-    pass
+    dotenv = None
 
-try:
+# Only a missing package is optional; a broken requests install should fail
+# loudly instead of looking like "not installed".
+_HAS_REQUESTS = importlib.util.find_spec("requests") is not None
+if _HAS_REQUESTS:
     import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util import Retry
+
+try:
+    from orjson import loads as json_loads
 except Exception:
-    requests = None  # we'll detect and exit politely later
+    json_loads = json.loads  # stdlib also accepts bytes, just slower on float-heavy bodies
 
-import snowflake.connector
+try:
+    from requests_toolbelt import MultipartEncoder
+except Exception:
+    MultipartEncoder = None  # fall back to _iter_multipart's chunked body
+
+# Run as `python scripts/test_snowflake.py`; make the api2 package importable.
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))
+
+from app import snowflake_db
 
 
 def require_env(name: str) -> str:
@@ -57,91 +82,176 @@ def require_env(name: str) -> str:
     return v
 
 
-def insert_measurement_row(
-    cur,
-    conn,
-    database: str | None,
-    schema: str | None,
+MEASUREMENT_COLUMNS = (
+    "driver_id",
+    "session_id",
+    "ts",
+    "perclos",
+    "perclos_percent",
+    "ear_threshold",
+    "pitchdown_avg",
+    "pitchdown_max",
+    "droop_time",
+    "droop_duty",
+    "pitch_threshold",
+    "yawn_count",
+    "yawn_time",
+    "yawn_duty",
+    "yawn_peak",
+    "confidence",
+    "fps",
+)
+
+
+# Response keys for MEASUREMENT_COLUMNS[3:], aligned by position; the first
+# three columns (driver, session, ts) need fallbacks and are filled in by hand.
+_PAYLOAD_KEYS = (
+    "perclos_30s",
+    "PERCLOS",
+    "ear_thresh_T",
+    "pitchdown_avg_30s",
+    "pitchdown_max_30s",
+    "droop_time_30s",
+    "droop_duty_30s",
+    "pitch_thresh_Tp",
+    "yawn_count_30s",
+    "yawn_time_30s",
+    "yawn_duty_30s",
+    "yawn_peak_30s",
+    "confidence",
+    "fps",
+)
+
+
+def measurement_row(
     payload: dict[str, Any],
     fallback_driver: str,
     fallback_session: str,
-    ts_seconds: int,
-) -> None:
-    """Insert an aggregate window payload into DROWSINESS_MEASUREMENTS."""
+    default_ts: str,
+) -> tuple[Any, ...]:
+    """Map an aggregate window payload onto MEASUREMENT_COLUMNS.
+
+    default_ts is used when the payload has no ts_end; callers compute it once
+    per batch.
+    """
 
     driver_value = payload.get("driver_id") or fallback_driver or "demo_driver"
     session_value = payload.get("session_id") or fallback_session or f"{driver_value}_session"
-    ts_value = payload.get("ts_end")
-    if not ts_value:
-        ts_value = datetime.now(timezone.utc).isoformat()
-
-    measurement = {
-        "driver_id": driver_value,
-        "session_id": session_value,
-        "ts": ts_value,
-        "perclos": payload.get("perclos_30s"),
-        "perclos_percent": payload.get("PERCLOS"),
-        "ear_threshold": payload.get("ear_thresh_T"),
-        "pitchdown_avg": payload.get("pitchdown_avg_30s"),
-        "pitchdown_max": payload.get("pitchdown_max_30s"),
-        "droop_time": payload.get("droop_time_30s"),
-        "droop_duty": payload.get("droop_duty_30s"),
-        "pitch_threshold": payload.get("pitch_thresh_Tp"),
-        "yawn_count": payload.get("yawn_count_30s"),
-        "yawn_time": payload.get("yawn_time_30s"),
-        "yawn_duty": payload.get("yawn_duty_30s"),
-        "yawn_peak": payload.get("yawn_peak_30s"),
-        "confidence": payload.get("confidence"),
-        "fps": payload.get("fps"),
-    }
-
-    table_parts = [p for p in (database, schema, "DROWSINESS_MEASUREMENTS") if p]
-    table_name = ".".join(table_parts) if table_parts else "DROWSINESS_MEASUREMENTS"
-    columns = ",".join(measurement.keys())
-    placeholders = ",".join(["%s"] * len(measurement))
-    sql = f"INSERT INTO {table_name} ({columns}) VALUES ({placeholders})"
-    cur.execute(sql, list(measurement.values()))
+    ts_value = payload.get("ts_end") or default_ts
+
+    return (driver_value, session_value, ts_value, *map(payload.get, _PAYLOAD_KEYS))
+
+
+MEASUREMENT_STAGE = "@~/meas_stage"
+
+
+def measurement_table(database: str | None, schema: str | None) -> str:
+    """Fully qualified DROWSINESS_MEASUREMENTS name, resolved once per run."""
+    return ".".join(p for p in (database, schema, "DROWSINESS_MEASUREMENTS") if p)
+
+
+def copy_measurement_rows(cur, conn, table: str, rows: list[tuple[Any, ...]]) -> int:
+    """Bulk-load the collected rows with one PUT + COPY INTO and a single commit.
+
+    Rows are written to an in-memory gzip CSV and streamed to the user stage,
+    so no bind parameters go over the wire.
+    """
+
+    if not rows:
+        return 0
+    buf = io.BytesIO()
+    with gzip.GzipFile(fileobj=buf, mode="wb") as gz:
+        text = io.TextIOWrapper(gz, encoding="utf-8", newline="")
+        csv.writer(text).writerows(tuple("" if v is None else v for v in row) for row in rows)
+        text.flush()
+        text.detach()
+    buf.seek(0)
+
+    name = f"measurements_{uuid.uuid4().hex}.csv.gz"
+    cur.execute(
+        f"PUT file://{name} {MEASUREMENT_STAGE} AUTO_COMPRESS=FALSE SOURCE_COMPRESSION=GZIP",
+        file_stream=buf,
+    )
+    cur.execute(
+        f"COPY INTO {table} ({','.join(MEASUREMENT_COLUMNS)}) FROM {MEASUREMENT_STAGE} "
+        f"FILES=('{name}') "
+        "FILE_FORMAT=(TYPE=CSV COMPRESSION=GZIP FIELD_OPTIONALLY_ENCLOSED_BY='\"' NULL_IF=('')) "
+        "ON_ERROR=ABORT_STATEMENT PURGE=TRUE"
+    )
     conn.commit()
-    print(
-        f"[Snowflake] Inserted row for driver={driver_value}, session={session_value}, "
-        f"timestamp={ts_value}, window={ts_seconds}s"
+    print(f"[Snowflake] Bulk loaded {len(rows)} measurement rows via {name}")
+    return len(rows)
+
+
+@dataclass(frozen=True, slots=True)
+class SfConfig:
+    user: str
+    password: str
+    account: str | None
+    host: str | None
+    warehouse: str | None
+    database: str
+    schema: str
+    api_base_url: str
+    upload_workers: int
+
+
+@lru_cache(maxsize=1)
+def load_config() -> SfConfig:
+    """Load .env once and read every setting this script uses."""
+    if dotenv is not None:
+        dotenv.load_dotenv()
+    return SfConfig(
+        user=require_env("SNOWFLAKE_USER"),
+        password=require_env("SNOWFLAKE_PASSWORD"),
+        account=os.getenv("SNOWFLAKE_ACCOUNT"),
+        host=os.getenv("SNOWFLAKE_HOST"),
+        warehouse=os.getenv("SNOWFLAKE_WAREHOUSE"),
+        database=os.getenv("SNOWFLAKE_DATABASE", "LCD_ENDPOINTS"),
+        schema=os.getenv("SNOWFLAKE_SCHEMA", "PUBLIC"),
+        api_base_url=os.getenv("API_BASE_URL", "http://localhost:8000").rstrip('/'),
+        upload_workers=int(os.getenv("UPLOAD_WORKERS", "8")),
     )
 
 
-def main() -> None:
-    user = require_env("SNOWFLAKE_USER")
-    password = require_env("SNOWFLAKE_PASSWORD")
-    account = os.getenv("SNOWFLAKE_ACCOUNT")
-    host = os.getenv("SNOWFLAKE_HOST")
-    warehouse = os.getenv("SNOWFLAKE_WAREHOUSE")
-    database = os.getenv("SNOWFLAKE_DATABASE", "LCD_ENDPOINTS")
-    schema = os.getenv("SNOWFLAKE_SCHEMA", "PUBLIC")
-
+def build_conn_kwargs(cfg: SfConfig) -> dict[str, Any]:
     conn_kwargs: dict[str, Any] = dict(
-        user=user,
-        password=password,
-        database=database,
-        schema=schema,
+        user=cfg.user,
+        password=cfg.password,
+        database=cfg.database,
+        schema=cfg.schema,
     )
 
-    if host:
-        conn_kwargs["host"] = host
-        if account:
-            conn_kwargs["account"] = account
+    if cfg.host:
+        conn_kwargs["host"] = cfg.host
+        if cfg.account:
+            conn_kwargs["account"] = cfg.account
         else:
-            conn_kwargs["account"] = host.split(".")[0]
+            conn_kwargs["account"] = cfg.host.split(".")[0]
     else:
-        if not account:
+        if not cfg.account:
             print("ERROR: either SNOWFLAKE_ACCOUNT or SNOWFLAKE_HOST must be set", file=sys.stderr)
             sys.exit(2)
-        conn_kwargs["account"] = account
+        conn_kwargs["account"] = cfg.account
 
-    if warehouse:
-        conn_kwargs["warehouse"] = warehouse
+    if cfg.warehouse:
+        conn_kwargs["warehouse"] = cfg.warehouse
 
     return conn_kwargs
 
 
+def get_conn(cfg: SfConfig):
+    """Return the process-wide session for cfg.
+
+    Repeated main() calls in one process (a test harness, a notebook) reuse
+    the authenticated session instead of logging in again; it is closed at
+    interpreter exit.
+    """
+    # Explicit transactions: the only write is the final batch load, which
+    # commits once (or rolls back) as a unit.
+    return snowflake_db.shared_connection(autocommit=False, **build_conn_kwargs(cfg))
+
+
 def ensure_warehouse(cursor, warehouse: str | None) -> str | None:
     """Try to ensure there's an active warehouse for the session.
     Returns the warehouse in use or None."""
@@ -155,66 +265,144 @@ def ensure_warehouse(cursor, warehouse: str | None) -> str | None:
         print(f"Could not set warehouse {warehouse}: {we}")
         # try to discover
     try:
+        # Pick one candidate server-side (running warehouses first) instead of
+        # pulling the whole list and trying USE on each.
         cursor.execute("SHOW WAREHOUSES")
-        wh_rows = cursor.fetchall()
-        wh_desc = [d[0].upper() for d in cursor.description]
-        name_idx = None
-        for i, n in enumerate(wh_desc):
-            if n in ("NAME", "WAREHOUSE_NAME"):
-                name_idx = i
-                break
-        if name_idx is None:
-            name_idx = 0
-        candidates = [r[name_idx] for r in wh_rows]
-        print("Available warehouses:")
-        for c in candidates:
-            print(f"  - {c}")
-        for candidate in candidates:
-            try:
-                cursor.execute(f"USE WAREHOUSE {candidate}")
-                print(f"Using discovered warehouse: {candidate}")
-                return candidate
-            except Exception:
-                continue
+        cursor.execute(
+            'SELECT "name" FROM TABLE(RESULT_SCAN(LAST_QUERY_ID())) '
+            'ORDER BY "state" = \'STARTED\' DESC, "name" LIMIT 1'
+        )
+        found = cursor.fetchone()
+        if found:
+            candidate = found[0]
+            cursor.execute(f"USE WAREHOUSE {candidate}")
+            print(f"Using discovered warehouse: {candidate}")
+            return candidate
     except Exception as se:
-        print(f"Could not list warehouses: {se}")
+        print(f"Could not discover a warehouse: {se}")
     print("Continuing without an active warehouse.")
     return None
 
 
-def find_video_files(footage_dir: Path) -> list[Path]:
-    exts = ("*.mp4", "*.mov", "*.avi", "*.mkv", "*.mpg", "*.webm")
-    files: list[Path] = []
-    if not footage_dir.exists():
-        return files
-    for ext in exts:
-        files.extend(sorted(footage_dir.glob(ext)))
-    return files
+def print_snowflake_diagnostics(cur, warehouse: str | None, database: str | None, schema: str | None) -> None:
+    """Pick a warehouse and print who we are connected as plus current table sizes."""
+    ensure_warehouse(cur, warehouse)
 
+    drivers_q = f"SELECT COUNT(*) FROM {database}.{schema}.DRIVERS"
+    meas_q = f"SELECT COUNT(*) FROM {database}.{schema}.DROWSINESS_MEASUREMENTS"
 
-def _float_or_none(x: Any):
+    # Identity and both counts in one round trip; the separate queries below
+    # only run to report which table failed.
     try:
-        return None if x is None else float(x)
+        cur.execute(f"SELECT CURRENT_USER(), CURRENT_ACCOUNT(), ({drivers_q}), ({meas_q})")
+        user, account, drivers_c, meas_c = cur.fetchone()
+        print("Connected as:", (user, account))
+        print(f"DRIVERS rows: {drivers_c}")
+        print(f"DROWSINESS_MEASUREMENTS rows: {meas_c}")
+        return
     except Exception:
-        return None
+        pass
 
+    cur.execute("SELECT CURRENT_USER(), CURRENT_ACCOUNT()")
+    row = cur.fetchone()
+    print("Connected as:", row)
 
-def _int_or_none(x: Any):
-    try:
-        return None if x is None else int(x)
-    except Exception:
-        return None
+    for name, q in [("DRIVERS", drivers_q), ("DROWSINESS_MEASUREMENTS", meas_q)]:
+        try:
+            cur.execute(q)
+            c = cur.fetchone()[0]
+            print(f"{name} rows: {c}")
+        except Exception as e:
+            print(f"Could not query {name}: {e}")
+
+
+VIDEO_EXTS = frozenset({".mp4", ".mov", ".avi", ".mkv", ".mpg", ".webm"})
+
+
+def find_video_files(footage_dir: Path) -> list[Path]:
+    """Videos directly under ``footage_dir``, sorted by name, from one directory read."""
+    if not footage_dir.exists():
+        return []
+    # scandir's DirEntry.is_file() uses the d_type from readdir, so no
+    # per-entry stat; suffixes are matched case-insensitively.
+    with os.scandir(footage_dir) as entries:
+        return sorted(
+            (
+                Path(entry.path)
+                for entry in entries
+                if entry.is_file() and os.path.splitext(entry.name)[1].lower() in VIDEO_EXTS
+            ),
+            key=lambda p: p.name,
+        )
+
+
+def post_video(upload_url: str, video_path: Path, fields: dict[str, str], http=None):
+    """POST one video to the analysis endpoint.
+
+    The file is memory-mapped so the body is read straight from the page
+    cache (warm after the first of the three timestamps). With
+    requests_toolbelt installed its MultipartEncoder streams the body;
+    otherwise _iter_multipart sends it chunked. Either way only one chunk
+    of the file is in flight at a time. Pass a shared
+    ``requests.Session`` as ``http`` to reuse connections.
+    """
+    http = http or requests
+    with open(video_path, "rb") as fh, _map_readonly(fh) as body:
+        if MultipartEncoder is not None:
+            encoder = MultipartEncoder(
+                fields={**fields, "video": (video_path.name, body, "application/octet-stream")}
+            )
+            return http.post(
+                upload_url,
+                data=encoder,
+                headers={"Content-Type": encoder.content_type},
+                timeout=180,
+            )
+        boundary = uuid.uuid4().hex
+        return http.post(
+            upload_url,
+            data=_iter_multipart(fields, "video", video_path.name, body, boundary),
+            headers={"Content-Type": f"multipart/form-data; boundary={boundary}"},
+            timeout=180,
+        )
+
+
+_UPLOAD_CHUNK = 64 * 1024
+
+
+def _iter_multipart(fields: dict[str, str], file_field: str, filename: str, body, boundary: str):
+    """Yield a multipart/form-data body with the file read in 64 KB chunks."""
+    for name, value in fields.items():
+        yield (
+            f"--{boundary}\r\nContent-Disposition: form-data; name=\"{name}\"\r\n\r\n{value}\r\n"
+        ).encode("utf-8")
+    yield (
+        f"--{boundary}\r\nContent-Disposition: form-data; name=\"{file_field}\"; filename=\"{filename}\"\r\n"
+        "Content-Type: application/octet-stream\r\n\r\n"
+    ).encode("utf-8")
+    while chunk := body.read(_UPLOAD_CHUNK):
+        yield chunk
+    yield f"\r\n--{boundary}--\r\n".encode("utf-8")
+
+
+def _map_readonly(fh):
+    # mmap refuses empty files; hand those back as the plain file object.
+    if os.fstat(fh.fileno()).st_size == 0:
+        return nullcontext(fh)
+    return mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
 
 
 def main() -> None:
-    if requests is None:
+    if not _HAS_REQUESTS:
         print("requests is not installed. Install it with: pip install requests", file=sys.stderr)
         sys.exit(2)
 
-    conn_kwargs = build_conn_kwargs()
-    database = conn_kwargs.get("database")
-    schema = conn_kwargs.get("schema")
-    warehouse = conn_kwargs.get("warehouse")
+    cfg = load_config()
+    conn_kwargs = build_conn_kwargs(cfg)
+    database = cfg.database
+    schema = cfg.schema
+    warehouse = cfg.warehouse
+    table = measurement_table(database, schema)
 
     print("Connecting to Snowflake with:")
     print(f"  user={conn_kwargs.get('user')}")
@@ -224,7 +412,7 @@ def main() -> None:
         print(f"  warehouse={warehouse}")
 
     try:
-        conn = snowflake.connector.connect(**conn_kwargs)
+        conn = get_conn(cfg)
     except Exception:
         print("Failed to connect to Snowflake:")
         traceback.print_exc()
@@ -234,216 +422,121 @@ def main() -> None:
         print("Connection parameters used:", safe, file=sys.stderr)
         sys.exit(3)
 
+    cur = conn.cursor()
     try:
-        cur = conn.cursor()
-        try:
-            # ensure warehouse
-            ensure_warehouse(cur, warehouse)
-
-            cur.execute("SELECT CURRENT_USER(), CURRENT_ACCOUNT()")
-            row = cur.fetchone()
-            print("Connected as:", row)
-
-            drivers_q = f"SELECT COUNT(*) FROM {database}.{schema}.DRIVERS"
-            meas_q = f"SELECT COUNT(*) FROM {database}.{schema}.DROWSINESS_MEASUREMENTS"
-
-            for name, q in [("DRIVERS", drivers_q), ("DROWSINESS_MEASUREMENTS", meas_q)]:
+        # --- Batch upload: post every video to /api/window to populate Snowflake ---
+        # Locate the videos directory relative to this script
+        script_dir = Path(__file__).parent
+        videos_dir = script_dir.parent / "videos"
+        if not videos_dir.exists():
+            print_snowflake_diagnostics(cur, warehouse, database, schema)
+            print("\nNo videos directory found; skipping API uploads.")
+            return
+
+        truck_map = {
+            "sample1.mov": "LF-101",
+            "sample2.mp4": "LF-202",
+            "sample3.mov": "LF-303",
+            "sample4.mov": "LF-404",
+        }
+        ping_seconds = (30, 60, 90)
+        upload_url = f"{cfg.api_base_url}/api/window"
+        upload_workers = cfg.upload_workers
+        processed = 0
+        rows_to_insert: list[tuple[Any, ...]] = []
+        default_ts = datetime.now(timezone.utc).isoformat()
+
+        video_files = find_video_files(videos_dir)
+        if not video_files:
+            print_snowflake_diagnostics(cur, warehouse, database, schema)
+            print("\nNo video files found in videos/; skipping API uploads.")
+            return
+
+        tasks = []
+        for video_path in video_files:
+            truck_id = truck_map.get(video_path.name)
+            if not truck_id:
+                print(f"Skipping {video_path.name}: no truck mapping provided.")
+                continue
+            session_id = f"{truck_id}_{video_path.stem}"
+            tasks.extend((video_path, truck_id, session_id, ts) for ts in ping_seconds)
+
+        # No point in idle threads (or keep-alive slots) beyond the task count.
+        upload_workers = max(1, min(upload_workers, len(tasks)))
+        print(
+            f"\nUploading {len(video_files)} videos to {upload_url} at timestamps {ping_seconds} "
+            f"({upload_workers} at a time)"
+        )
+        # Uploads are network-bound; one shared Session keeps the
+        # connections to the API server alive across threads.
+        with requests.Session() as http, ThreadPoolExecutor(max_workers=upload_workers) as pool:
+            # Size the keep-alive pool to the worker count so no upload has
+            # to open (and later discard) an extra connection.
+            # Only connection-level failures are retried: urllib3 won't replay a
+            # POST on 5xx, and a streamed upload body can't be rewound anyway.
+            adapter = HTTPAdapter(
+                pool_connections=upload_workers,
+                pool_maxsize=upload_workers,
+                max_retries=Retry(total=2, backoff_factor=0.3),
+            )
+            http.mount("http://", adapter)
+            http.mount("https://", adapter)
+            futures = [
+                pool.submit(
+                    post_video,
+                    upload_url,
+                    video_path,
+                    {"timestamp": str(ts), "session_id": session_id, "driver_id": truck_id},
+                    http,
+                )
+                for video_path, truck_id, session_id, ts in tasks
+            ]
+            # The uploads are in flight; overlap the Snowflake round trips with them.
+            print_snowflake_diagnostics(cur, warehouse, database, schema)
+            # Results are reported in submission order so the log reads the same as before.
+            for (video_path, truck_id, session_id, ts), future in zip(tasks, futures):
                 try:
-                    cur.execute(q)
-                    c = cur.fetchone()[0]
-                    print(f"{name} rows: {c}")
-                except Exception as e:
-                    print(f"Could not query {name}: {e}")
-
-<<<<<<< Updated upstream
-            # --- Batch upload: post every video to /api/window to populate Snowflake ---
-            try:
-                import requests
-            except Exception:
-                print("\nrequests library not installed; skipping API tester upload. Install with: pip install requests")
-            else:
-                from pathlib import Path
-                import json
-
-                # Locate the videos directory relative to this script
-                script_dir = Path(__file__).parent
-                videos_dir = script_dir.parent / "videos"
-                if not videos_dir.exists():
-                    print("\nNo videos directory found; skipping API uploads.")
-                else:
-                    truck_map = {
-                        "sample1.mov": "LF-101",
-                        "sample2.mp4": "LF-202",
-                        "sample3.mov": "LF-303",
-                        "sample4.mov": "LF-404",
-                    }
-                    ping_seconds = (30, 60, 90)
-                    allowed_exts = {".mp4", ".mov", ".avi", ".mkv", ".mpg", ".webm"}
-                    base_url = os.getenv("API_BASE_URL", "http://localhost:8000").rstrip('/')
-                    upload_url = f"{base_url}/api/window"
-                    processed = 0
-
-                    video_files = sorted(
-                        [p for p in videos_dir.iterdir() if p.is_file() and p.suffix.lower() in allowed_exts],
-                        key=lambda p: p.name,
-                    )
-
-                    if not video_files:
-                        print("\nNo video files found in videos/; skipping API uploads.")
-                    else:
-                        print(f"\nUploading {len(video_files)} videos to {upload_url} at timestamps {ping_seconds}")
-                        for video_path in video_files:
-                            truck_id = truck_map.get(video_path.name)
-                            if not truck_id:
-                                print(f"Skipping {video_path.name}: no truck mapping provided.")
-                                continue
-
-                            session_id = f"{truck_id}_{video_path.stem}"
-                            for ts in ping_seconds:
-                                print(f"\nUploading {video_path.name} for truck {truck_id} at t={ts}s")
-                                try:
-                                    with open(video_path, "rb") as fh:
-                                        files = {"video": (video_path.name, fh, "application/octet-stream")}
-                                        data = {
-                                            "timestamp": str(ts),
-                                            "session_id": session_id,
-                                            "driver_id": truck_id,
-                                        }
-                                        resp = requests.post(upload_url, files=files, data=data, timeout=180)
-                                    resp.raise_for_status()
-                                except Exception as exc:
-                                    resp_obj = getattr(exc, "response", None)
-                                    code = getattr(resp_obj, "status_code", "n/a")
-                                    print(f"Upload failed for {video_path.name} @ {ts}s: {exc} (status {code})")
-                                    if resp_obj is not None:
-                                        try:
-                                            print(resp_obj.text)
-                                        except Exception:
-                                            pass
-                                    continue
-
-                                processed += 1
-                                try:
-                                    payload = resp.json()
-                                    try:
-                                        insert_measurement_row(
-                                            cur,
-                                            conn,
-                                            database,
-                                            schema,
-                                            payload,
-                                            truck_id,
-                                            session_id,
-                                            ts,
-                                        )
-                                    except Exception as db_exc:
-                                        print(
-                                            f"[Snowflake] Insert failed for session {session_id} at {ts}s: {db_exc}"
-                                        )
-                                    # Show a concise summary so we know the analysis succeeded.
-                                    perclos = payload.get("perclos_30s")
-                                    yawn_count = payload.get("yawn_count_30s")
-                                    print(
-                                        f"Success -> session={session_id}, timestamp={ts}, "
-                                        f"perclos_30s={perclos}, yawn_count_30s={yawn_count}"
-                                    )
-                                    print(json.dumps({"driver_id": truck_id, "session_id": session_id}, indent=2))
-                                except Exception:
-                                    print("Upload succeeded but response was not JSON:")
-                                    try:
-                                        print(resp.text)
-                                    except Exception:
-                                        pass
-
-                        if processed == 0:
-                            print("\nNo API uploads were completed successfully.")
-=======
-            # find videos and run analysis 3 times per file (look in api2/videos)
-            script_dir = Path(__file__).parent
-            footage_dir = script_dir.parent / "videos"
-            video_files = find_video_files(footage_dir)
-
-            if not video_files:
-                print("No videos found in api2/videos; nothing to upload.")
-                return
-
-            base_url = os.getenv("API_BASE_URL", "http://localhost:8000").rstrip('/')
-            upload_url = f"{base_url}/api/window"
-            timestamps = [30, 60, 90]
-
-            for video_file in video_files:
-                driver_id = video_file.stem
-                for ts in timestamps:
-                    print(f"\nUploading {video_file.name} to {upload_url} with timestamp={ts} (driver_id={driver_id})")
-                    try:
-                        with open(video_file, 'rb') as fh:
-                            files = {'video': (video_file.name, fh, 'application/octet-stream')}
-                            data = {'timestamp': str(ts), 'session_id': f'{driver_id}_{ts}', 'driver_id': driver_id}
-                            resp = requests.post(upload_url, files=files, data=data, timeout=180)
-                        resp.raise_for_status()
-                    except Exception as e:
-                        print(f"Upload failed for {video_file.name} ts={ts}: {e}")
+                    resp = future.result()
+                    resp.raise_for_status()
+                except Exception as exc:
+                    resp_obj = getattr(exc, "response", None)
+                    code = getattr(resp_obj, "status_code", "n/a")
+                    print(f"Upload failed for {video_path.name} @ {ts}s: {exc} (status {code})")
+                    if resp_obj is not None:
                         try:
-                            print(getattr(resp, 'text', ''))
+                            print(resp_obj.text)
                         except Exception:
                             pass
-                        continue
+                    continue
 
+                processed += 1
+                try:
+                    payload = json_loads(resp.content)
+                    rows_to_insert.append(measurement_row(payload, truck_id, session_id, default_ts))
+                    # Show a concise summary so we know the analysis succeeded.
+                    perclos = payload.get("perclos_30s")
+                    yawn_count = payload.get("yawn_count_30s")
+                    print(
+                        f"Success -> {video_path.name} session={session_id}, timestamp={ts}, "
+                        f"perclos_30s={perclos}, yawn_count_30s={yawn_count}"
+                    )
+                    print(f'{{"driver_id": "{truck_id}", "session_id": "{session_id}"}}')
+                except Exception:
+                    print("Upload succeeded but response was not JSON:")
                     try:
-                        payload = resp.json()
+                        print(resp.text)
                     except Exception:
-                        print("Upload succeeded but response was not JSON:")
-                        try:
-                            print(resp.text)
-                        except Exception:
-                            pass
-                        payload = None
-
-                    if not payload:
-                        continue
-
-                    # Extract requested fields and insert into Snowflake
-                    fields = [
-                        'perclos_30s',
-                        'pitchdown_avg_30s',
-                        'pitchdown_max_30s',
-                        'droop_time_30s',
-                        'droop_duty_30s',
-                        'yawn_count_30s',
-                        'yawn_time_30s',
-                        'yawn_duty_30s',
-                        'yawn_peak_30s',
-                    ]
-
-                    values = []
-                    for f in fields:
-                        v = payload.get(f)
-                        if f == 'yawn_count_30s':
-                            values.append(_int_or_none(v))
-                        else:
-                            values.append(_float_or_none(v))
-
-                    measured_at = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
-                    insert_cols = ['driver_id', 'timestamp'] + fields
-                    insert_vals = [driver_id, measured_at] + values
-
-                    placeholders = ",".join(["%s"] * len(insert_cols))
-                    cols_join = ",".join(insert_cols)
-                    insert_sql = f"INSERT INTO {database}.{schema}.DROWSINESS_MEASUREMENTS ({cols_join}) VALUES ({placeholders})"
-                    try:
-                        cur.execute(insert_sql, insert_vals)
-                        print(f"Inserted measurement into DROWSINESS_MEASUREMENTS for {driver_id} ts={ts}, rowcount={cur.rowcount}")
-                        cur.execute(meas_q)
-                        newc = cur.fetchone()[0]
-                        print(f"DROWSINESS_MEASUREMENTS rows after insert: {newc}")
-                    except Exception as ie:
-                        print(f"Failed to insert measurement: {ie}")
-
->>>>>>> Stashed changes
-        finally:
-            cur.close()
+                        pass
+
+        if processed == 0:
+            print("\nNo API uploads were completed successfully.")
+        try:
+            copy_measurement_rows(cur, conn, table, rows_to_insert)
+        except Exception as db_exc:
+            conn.rollback()
+            print(f"[Snowflake] Batch insert of {len(rows_to_insert)} rows failed: {db_exc}")
     finally:
-        conn.close()
+        cur.close()
 
 
 if __name__ == "__main__":
@@ -2,9 +2,10 @@
 """Test Snowflake connection using host parameter"""
 
 import os
-import snowflake.connector
 from dotenv import load_dotenv
 
+from app import snowflake_db
+
 load_dotenv()
 
 def test_host_connection():
@@ -23,8 +24,8 @@ def test_host_connection():
     print("=" * 60)
     
     try:
-        # Connect using host parameter
-        conn = snowflake.connector.connect(
+        # Connect using host parameter (reuses a session already open in this process)
+        conn = snowflake_db.shared_connection(
             user=user,
             password=password,
             account=account,
@@ -33,6 +34,7 @@ def test_host_connection():
             database=database,
             schema=schema,
             login_timeout=30,
+            autocommit=True,
         )
         
         print("✅ Successfully connected to Snowflake!")
@@ -47,33 +49,38 @@ def test_host_connection():
         print(f"Database: {result[2]}")
         print(f"Schema: {result[3]}")
         
-        # Test STATUS_TABLE
+        # Test STATUS_TABLE: read, insert and verify in one round-trip
         print(f"\nTesting STATUS_TABLE...")
-        cur.execute("SELECT COUNT(*) FROM STATUS_TABLE")
+        cur.execute(
+            "SELECT COUNT(*) FROM STATUS_TABLE;"
+            " SELECT * FROM STATUS_TABLE ORDER BY TIME_CREATED DESC LIMIT 5;"
+            " INSERT INTO STATUS_TABLE (STATUS, TIME_CREATED) VALUES (%s, CURRENT_TIMESTAMP());"
+            " SELECT COUNT(*) FROM STATUS_TABLE WHERE STATUS = %s",
+            ("TEST_OK", "TEST_OK"),
+            num_statements=4,
+        )
         count = cur.fetchone()[0]
         print(f"STATUS_TABLE contains {count} records")
         
-        if count > 0:
-            cur.execute("SELECT * FROM STATUS_TABLE ORDER BY TIME_CREATED DESC LIMIT 5")
-            rows = cur.fetchall()
+        cur.nextset()
+        rows = cur.fetchall()
+        if rows:
             print("Recent entries:")
             for row in rows:
                 print(f"  Status: {row[0]}, Time: {row[1]}")
         
-        # Test insert
+        # Test insert (autocommit, so no separate COMMIT)
         print(f"\nTesting insert...")
-        cur.execute("INSERT INTO STATUS_TABLE (STATUS, TIME_CREATED) VALUES (%s, CURRENT_TIMESTAMP())", ("TEST_OK",))
-        rows_affected = cur.rowcount
-        conn.commit()
+        cur.nextset()
+        rows_affected = cur.fetchone()[0]
         print(f"Inserted test record, rows affected: {rows_affected}")
         
         # Verify insert
-        cur.execute("SELECT COUNT(*) FROM STATUS_TABLE WHERE STATUS = %s", ("TEST_OK",))
+        cur.nextset()
         test_count = cur.fetchone()[0]
         print(f"Test records found: {test_count}")
         
         cur.close()
-        conn.close()
         
         print("\n🎉 All tests passed! Snowflake connection is working.")
         return True
@@ -3,7 +3,7 @@
 from __future__ import annotations
 
 from app.analyzer import WindowAnalyzer
-from app.models import Sample
+from app.models import Sample, SampleBatch
 
 
 def make_sample(
@@ -28,11 +28,12 @@ def integrate_fraction(analyzer: WindowAnalyzer, samples: list[Sample], ear_thre
     start = samples[0].time
     end = samples[-1].time
     window = max(end - start, 1e-6)
-    active = analyzer._integrate_boolean(  # type: ignore[attr-defined]
-        samples,
+    batch = SampleBatch.from_samples(samples)
+    active = analyzer._integrate_boolean_np(  # type: ignore[attr-defined]
+        batch.time,
+        analyzer._is_eye_closed_np(batch.ear, batch.confidence, batch.has_face, ear_thresh),  # type: ignore[attr-defined]
         start,
         end,
-        lambda s: analyzer._is_eye_closed(s, ear_thresh),
     )
     return active / window
 
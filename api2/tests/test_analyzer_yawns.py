@@ -1,3 +1,5 @@
+import numpy as np
+
 from app.analyzer import WindowAnalyzer
 from app.models import Sample
 
@@ -14,18 +16,19 @@ def make_sample(time: float, mar: float | None, conf: float = 0.9, has_face: boo
 
 
 def build_samples(start: float, end: float, high_start: float, high_end: float, drop_segment: tuple[float, float] | None = None):
-    t = start
-    samples: list[Sample] = []
-    while t <= end:
-        mar = 0.35
-        conf = 0.95
-        if high_start <= t <= high_end:
-            mar = 0.85
-        if drop_segment and drop_segment[0] <= t <= drop_segment[1]:
-            conf = 0.2
-        samples.append(make_sample(round(t, 3), mar, conf))
-        t += 0.05
-    return samples
+    # cumsum adds the steps one at a time, so the grid carries the same float drift
+    # as stepping t += 0.05; segment bounds compare against it before rounding.
+    steps = np.full(int((end - start) / 0.05) + 2, 0.05)
+    steps[0] = start
+    grid = np.cumsum(steps)
+    grid = grid[grid <= end]
+    mar = np.full_like(grid, 0.35)
+    mar[(grid >= high_start) & (grid <= high_end)] = 0.85
+    conf = np.full_like(grid, 0.95)
+    if drop_segment:
+        conf[(grid >= drop_segment[0]) & (grid <= drop_segment[1])] = 0.2
+    times = np.round(grid, 3)
+    return [make_sample(t, m, c) for t, m, c in zip(times.tolist(), mar.tolist(), conf.tolist())]
 
 
 def test_detects_yawn_when_mar_above_threshold():
@@ -8,6 +8,19 @@ from app.sim_vitals import VitalsSimulator
 from app.state_store import GLOBAL_STATE_STORE
 
 
+# ThresholdsUsed is frozen, so every test can share one instance.
+_DEFAULT_THRESHOLDS = ThresholdsUsed(
+    perclos_high_15s=0.25,
+    perclos_concerning_15s=0.15,
+    perclos_elevated_15s=0.08,
+    yawn_duty_concerning=0.15,
+    yawn_duty_high=0.25,
+    droop_duty_concerning=0.2,
+    droop_duty_high=0.4,
+    pitchdown_max_flag=25.0,
+)
+
+
 def make_state(state: str, confidence: str = "OK"):
     response = StateResponse(
         ts_end=datetime.now(timezone.utc),
@@ -16,17 +29,8 @@ def make_state(state: str, confidence: str = "OK"):
         state=state,
         risk_score=80,
         state_confidence=confidence,
-        reasons=[StateReason(signal="perclos_30s", value=0.2, threshold=0.15, relation=">=")],
-        thresholds_used=ThresholdsUsed(
-            perclos_high_30s=0.25,
-            perclos_concerning_30s=0.15,
-            perclos_elevated_30s=0.08,
-            yawn_duty_concerning=0.15,
-            yawn_duty_high=0.25,
-            droop_duty_concerning=0.2,
-            droop_duty_high=0.4,
-            pitchdown_max_flag=25.0,
-        ),
+        reasons=[StateReason(signal="perclos_15s", value=0.2, threshold=0.15, relation=">=")],
+        thresholds_used=_DEFAULT_THRESHOLDS,
     )
     GLOBAL_STATE_STORE.record(response)
 
@@ -4,27 +4,28 @@ from app.state_classifier import DriverStateClassifier
 from app.models import StateRequest
 
 
+_BASE_REQUEST = {
+    "ts_end": datetime(2025, 1, 1, tzinfo=timezone.utc),
+    "session_id": "session",
+    "driver_id": "driver",
+    "perclos_30s": 0.0,
+    "ear_thresh_T": 0.2,
+    "pitchdown_avg_30s": 5.0,
+    "pitchdown_max_30s": 5.0,
+    "droop_time_30s": 0.0,
+    "droop_duty_30s": 0.0,
+    "pitch_thresh_Tp": 15.0,
+    "yawn_count_30s": 0,
+    "yawn_time_30s": 0.0,
+    "yawn_duty_30s": 0.0,
+    "yawn_peak_30s": 0.0,
+    "confidence": "OK",
+    "fps": 15.0,
+}
+
+
 def build_request(**overrides):
-    base = {
-        "ts_end": datetime(2025, 1, 1, tzinfo=timezone.utc),
-        "session_id": "session",
-        "driver_id": "driver",
-        "perclos_30s": 0.0,
-        "ear_thresh_T": 0.2,
-        "pitchdown_avg_30s": 5.0,
-        "pitchdown_max_30s": 5.0,
-        "droop_time_30s": 0.0,
-        "droop_duty_30s": 0.0,
-        "pitch_thresh_Tp": 15.0,
-        "yawn_count_30s": 0,
-        "yawn_time_30s": 0.0,
-        "yawn_duty_30s": 0.0,
-        "yawn_peak_30s": 0.0,
-        "confidence": "OK",
-        "fps": 15.0,
-    }
-    base.update(overrides)
-    return StateRequest(**base)
+    return StateRequest(**(_BASE_REQUEST | overrides))
 
 
 def test_lucid_sample():
@@ -85,3 +86,48 @@ def test_low_confidence_flag():
     signals = {reason.signal for reason in response.reasons}
     assert "confidence" in signals
     assert "fps" in signals
+
+
+def test_classify_batch_matches_classify():
+    requests = [
+        build_request(perclos_15s=p, yawn_duty_15s=y, droop_duty_15s=d, yawn_count_15s=c)
+        for p, y, d, c in [
+            (0.05, 0.05, 0.05, 0),
+            (0.22, 0.18, 0.12, 0),
+            (0.47, 0.30, 0.25, 1),
+            (0.65, 0.0, 0.0, 0),
+            (0.10, 0.0, 0.0, 0),
+            (0.18, 0.0, 0.0, 0),
+        ]
+    ]
+    single = DriverStateClassifier()
+    expected = [single.classify(r) for r in requests]
+    batched = DriverStateClassifier().classify_batch(requests)
+    assert [r.model_dump() for r in batched] == [r.model_dump() for r in expected]
+
+
+def test_repeated_signal_vector_reuses_core_result():
+    classifier = DriverStateClassifier()
+    first = classifier.classify(build_request(driver_id="a", perclos_15s=0.47, droop_duty_15s=0.25))
+    second = classifier.classify(build_request(driver_id="b", perclos_15s=0.47, droop_duty_15s=0.25))
+    assert len(classifier._core_cache) == 1
+    assert second.state == first.state
+    assert second.risk_score == first.risk_score
+    assert [r.model_dump() for r in second.reasons] == [r.model_dump() for r in first.reasons]
+
+
+def test_fast_reason_constructor_matches_validated_model():
+    from app.models import StateReason
+    from app.state_classifier import _make_reason
+
+    samples = [
+        ("perclos_15s", 0.47, 0.45, ">="),
+        ("yawn_count_15s", 1, 1, ">="),
+        ("missing:fps", None, 0, "missing"),
+        ("confidence", "LOW", "OK", "!="),
+    ]
+    for signal, value, threshold, relation in samples:
+        fast = _make_reason(signal, value, threshold, relation)
+        validated = StateReason(signal=signal, value=value, threshold=threshold, relation=relation)
+        assert fast.model_dump() == validated.model_dump()
+        assert fast.model_dump_json() == validated.model_dump_json()
@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+import os
+
 from app.main import UPLOAD_CACHE_DIR, _materialize_upload_for_cache
 
 
@@ -21,3 +23,22 @@ def test_materialize_upload_deduplicates(tmp_path):
 
     # Clean up cached artifact to avoid polluting other tests
     cached_path.unlink(missing_ok=True)
+
+
+def test_materialize_upload_keys_on_content_not_stat(tmp_path):
+    first_tmp = tmp_path / "first.mp4"
+    first_tmp.write_bytes(b"content-a")
+    stat = first_tmp.stat()
+    cached_first = _materialize_upload_for_cache(first_tmp, "same.mp4")
+
+    # Same name, size and mtime, different bytes: must not reuse the first entry.
+    second_tmp = tmp_path / "second.mp4"
+    second_tmp.write_bytes(b"content-b")
+    os.utime(second_tmp, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    cached_second = _materialize_upload_for_cache(second_tmp, "same.mp4")
+
+    assert cached_second != cached_first
+    assert cached_second.read_bytes() == b"content-b"
+
+    cached_first.unlink(missing_ok=True)
+    cached_second.unlink(missing_ok=True)
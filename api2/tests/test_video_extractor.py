@@ -0,0 +1,32 @@
+from __future__ import annotations
+
+import cv2
+import numpy as np
+
+from app.video import VideoWindowExtractor
+
+
+def write_video(path, frames: int = 50, fps: float = 10.0) -> None:
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"MJPG"), fps, (32, 24))
+    for i in range(frames):
+        writer.write(np.full((24, 32, 3), i * 5, dtype=np.uint8))
+    writer.release()
+
+
+def test_abandoned_window_does_not_block_other_reads(tmp_path):
+    video = tmp_path / "clip.avi"
+    write_video(video)
+
+    with VideoWindowExtractor(video) as extractor:
+        first = extractor.iter_window(0.0, 1.0)
+        next(first)  # left open mid-iteration
+
+        times = [t for t, _ in extractor.iter_window(2.0, 3.0)]
+        assert len(times) == 11
+        assert times[0] == 2.0
+
+        first.close()
+        assert extractor._idle_cap is not None
+
+    assert extractor._idle_cap is None
+    assert not extractor._busy_caps
@@ -4,11 +4,124 @@ Try modern Snowflake account identifier formats
 """
 
 import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import lru_cache
+
+import requests
 import snowflake.connector
+from snowflake.connector.errorcode import ER_CONNECTION_TIMEOUT, ER_HTTP_GENERAL_ERROR
 from dotenv import load_dotenv
 
+from app import snowflake_db
+
 load_dotenv()
 
+_print_lock = threading.Lock()
+
+
+def _log(message):
+    """Print a whole message at once so concurrent attempts don't interleave."""
+    with _print_lock:
+        print(message)
+
+
+# Connector errno values: HTTP failures are ER_HTTP_GENERAL_ERROR + status, and
+# login rejections carry the server's code.
+_AUTH_FAILED = 390100  # incorrect username/password: the account itself exists
+_FAILURE_MESSAGES = {
+    ER_HTTP_GENERAL_ERROR + 404: "   ❌ Account not found",
+    _AUTH_FAILED: "   ❌ Authentication failed (account exists but wrong credentials)",
+    ER_CONNECTION_TIMEOUT: "   ❌ Connection timeout",
+}
+
+# Fallback for exceptions without a usable errno (socket/requests errors, or a
+# connector error the table above doesn't cover): one scan of the message.
+_FAILURE_RE = re.compile(r"(404 Not Found|authentication failed|timeout)", re.I)
+_FAILURE_BY_TEXT = {
+    "404 not found": _FAILURE_MESSAGES[ER_HTTP_GENERAL_ERROR + 404],
+    "authentication failed": _FAILURE_MESSAGES[_AUTH_FAILED],
+    "timeout": _FAILURE_MESSAGES[ER_CONNECTION_TIMEOUT],
+}
+
+
+def _describe_failure(error):
+    errno = getattr(error, "errno", None)
+    try:
+        message = _FAILURE_MESSAGES.get(int(errno))
+    except (TypeError, ValueError):
+        message = None
+    if message:
+        return message
+    error_msg = str(error)
+    match = _FAILURE_RE.search(error_msg)
+    if match:
+        return _FAILURE_BY_TEXT[match.group(1).lower()]
+    return f"   ❌ Error: {error_msg[:50]}..."
+
+
+def _candidate_alive(account_format):
+    """Cheap preflight: unknown account hosts answer the login endpoint with 404.
+
+    A HEAD costs one TLS handshake and no login. Only a definite 404 rules a
+    format out; timeouts and other network errors are inconclusive, so those
+    formats still get the full connector attempt (with its longer timeout).
+    """
+    try:
+        response = requests.head(
+            f"https://{account_format}.snowflakecomputing.com/session/v1/login-request",
+            timeout=3,
+            allow_redirects=False,
+        )
+    except requests.RequestException:
+        return True
+    return response.status_code != 404
+
+
+@lru_cache(maxsize=4)
+def _formats(base):
+    """Candidate account identifiers for ``base``, most likely first."""
+    # Modern formats typically used by newer Snowflake accounts
+    return (
+        # Organization-Account format (most common for new accounts)
+        f"ORGNAME-{base}",
+        f"orgname-{base}",
+        f"ACCOUNT-{base}",
+        f"account-{base}",
+        
+        # Legacy with different regions
+        f"{base}",
+        f"{base.lower()}",
+        f"{base}.us-central1.gcp",
+        f"{base}.us-east-1.aws", 
+        f"{base}.us-west-2.aws",
+        f"{base}.eu-west-1.aws",
+        
+        # Without dots
+        f"{base}-us-east-1",
+        f"{base}-us-west-2",
+        
+        # Common organizational patterns
+        f"LUCID-{base}",
+        f"lucid-{base}",
+        f"GTAI-{base}",
+        f"gtai-{base}",
+    )
+
+
+def _close_late_success(future):
+    """Close connections from attempts that succeed after a winner was chosen."""
+    if not future.cancelled() and future.exception() is None:
+        future.result().close()
+
+
+def _cancel_others(futures, winner):
+    for other in futures:
+        if other is not winner:
+            other.cancel()
+            other.add_done_callback(_close_late_success)
+
 def try_modern_account_formats():
     """Try modern account identifier formats"""
     
@@ -20,95 +133,96 @@ def try_modern_account_formats():
     print(f"Trying modern account formats for base: {base_account}")
     print("=" * 60)
     
-    # Modern formats typically used by newer Snowflake accounts
-    modern_formats = [
-        # Organization-Account format (most common for new accounts)
-        f"ORGNAME-{base_account}",
-        f"orgname-{base_account}",
-        f"ACCOUNT-{base_account}",
-        f"account-{base_account}",
-        
-        # Legacy with different regions
-        f"{base_account}",
-        f"{base_account.lower()}",
-        f"{base_account}.us-central1.gcp",
-        f"{base_account}.us-east-1.aws", 
-        f"{base_account}.us-west-2.aws",
-        f"{base_account}.eu-west-1.aws",
-        
-        # Without dots
-        f"{base_account}-us-east-1",
-        f"{base_account}-us-west-2",
-        
-        # Common organizational patterns
-        f"LUCID-{base_account}",
-        f"lucid-{base_account}",
-        f"GTAI-{base_account}",
-        f"gtai-{base_account}",
-    ]
+    modern_formats = _formats(base_account)
     
-    for i, account_format in enumerate(modern_formats, 1):
-        print(f"\n{i:2d}. Testing: {account_format}")
-        
-        try:
-            # Try connection with minimal timeout to fail fast
-            conn = snowflake.connector.connect(
-                user=user,
-                password=password,
-                account=account_format,
-                warehouse=warehouse,
-                login_timeout=10,
-                network_timeout=15,
-            )
-            
-            print(f"✅ CONNECTION SUCCESS with: {account_format}")
+    # Every attempt is mostly waiting on the network, so run them all at once;
+    # the slowest failure, not the sum of them, bounds the wait.
+    def connect(account_format):
+        return snowflake.connector.connect(
+            user=user,
+            password=password,
+            account=account_format,
+            warehouse=warehouse,
+            login_timeout=10,
+            network_timeout=15,
+            **snowflake_db.small_result_options(),
+        )
+
+    pool = ThreadPoolExecutor(max_workers=len(modern_formats))
+    alive = list(pool.map(_candidate_alive, modern_formats))
+    for i, (account_format, ok) in enumerate(zip(modern_formats, alive), 1):
+        if not ok:
+            _log(f"\n{i:2d}. Testing: {account_format}\n   ❌ Account not found (preflight)")
+    futures = {
+        pool.submit(connect, account_format): (i, account_format)
+        for i, (account_format, ok) in enumerate(zip(modern_formats, alive), 1)
+        if ok
+    }
+    try:
+        for future in as_completed(futures):
+            i, account_format = futures[future]
+            try:
+                conn = future.result()
+            except Exception as e:
+                _log(f"\n{i:2d}. Testing: {account_format}\n{_describe_failure(e)}")
+                if getattr(e, "errno", None) != _AUTH_FAILED:
+                    continue
+                # The server knew the account and only rejected the password, so
+                # this is the identifier; the other formats can't do better.
+                _cancel_others(futures, future)
+                _log("✅ Account identifier validated (fix the credentials next)")
+                return account_format
+
+            _cancel_others(futures, future)
+
+            _log(f"\n{i:2d}. Testing: {account_format}\n✅ CONNECTION SUCCESS with: {account_format}")
             
             # Test basic queries
             cur = conn.cursor()
             cur.execute("SELECT CURRENT_ACCOUNT(), CURRENT_REGION(), CURRENT_ORGANIZATION_NAME()")
             result = cur.fetchone()
-            print(f"   Account: {result[0]}")
-            print(f"   Region: {result[1]}")
-            print(f"   Organization: {result[2]}")
+            _log(f"   Account: {result[0]}")
+            _log(f"   Region: {result[1]}")
+            _log(f"   Organization: {result[2]}")
             
-            # Test database access
+            # Test database access: switch to the project schema, count both
+            # tables and read the latest statuses in one round-trip.
+            # num_statements sets MULTI_STATEMENT_COUNT for this call only.
             try:
-                cur.execute("USE DATABASE LCD_ENDPOINTS")
-                cur.execute("USE SCHEMA PUBLIC")
+                cur.execute(
+                    "USE DATABASE LCD_ENDPOINTS;"
+                    " USE SCHEMA PUBLIC;"
+                    " SELECT COUNT(*) FROM STATUS_TABLE;"
+                    " SELECT COUNT(*) FROM DROWSINESS_MEASUREMENTS;"
+                    " SELECT * FROM STATUS_TABLE ORDER BY TIME_CREATED DESC LIMIT 3",
+                    num_statements=5,
+                )
+                cur.nextset()  # USE DATABASE
+                cur.nextset()  # USE SCHEMA
                 
                 # Check STATUS_TABLE
-                cur.execute("SELECT COUNT(*) FROM STATUS_TABLE")
                 status_count = cur.fetchone()[0]
-                print(f"   STATUS_TABLE records: {status_count}")
+                _log(f"   STATUS_TABLE records: {status_count}")
                 
                 # Check DROWSINESS_MEASUREMENTS
-                cur.execute("SELECT COUNT(*) FROM DROWSINESS_MEASUREMENTS") 
+                cur.nextset()
                 drowsiness_count = cur.fetchone()[0]
-                print(f"   DROWSINESS_MEASUREMENTS records: {drowsiness_count}")
+                _log(f"   DROWSINESS_MEASUREMENTS records: {drowsiness_count}")
                 
-                if status_count > 0:
-                    cur.execute("SELECT * FROM STATUS_TABLE ORDER BY TIME_CREATED DESC LIMIT 3")
-                    recent_statuses = cur.fetchall()
-                    print(f"   Recent statuses: {[row[0] for row in recent_statuses]}")
+                cur.nextset()
+                recent_statuses = cur.fetchall()
+                if recent_statuses:
+                    _log(f"   Recent statuses: {[row[0] for row in recent_statuses]}")
                     
             except Exception as db_error:
-                print(f"   ⚠️  Database access issue: {db_error}")
+                _log(f"   ⚠️  Database access issue: {db_error}")
             
             cur.close()
             conn.close()
             
             return account_format
-            
-        except Exception as e:
-            error_msg = str(e)
-            if "404 Not Found" in error_msg:
-                print(f"   ❌ Account not found")
-            elif "authentication failed" in error_msg.lower():
-                print(f"   ❌ Authentication failed (account exists but wrong credentials)")
-            elif "timeout" in error_msg.lower():
-                print(f"   ❌ Connection timeout")
-            else:
-                print(f"   ❌ Error: {error_msg[:50]}...")
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
     
     print(f"\n💡 None of the common formats worked. Please check:")
     print(f"   1. Your Snowflake web login URL")
@@ -4,35 +4,133 @@ Test script to verify the automatic data clearing functionality.
 """
 
 import requests
+import random
+import sys
+from collections import Counter
 import time
 import os
-import snowflake.connector
-from dotenv import load_dotenv
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
-load_dotenv()
+# Run from the repo root; make the api2 package importable.
+API_ROOT = Path(__file__).resolve().parent / "api2"
+if str(API_ROOT) not in sys.path:
+    sys.path.append(str(API_ROOT))
 
-def get_snowflake_count():
-    """Get current count of records in STATUS_TABLE"""
-    try:
-        conn = snowflake.connector.connect(
-            user=os.getenv('SNOWFLAKE_USER'),
-            password=os.getenv('SNOWFLAKE_PASSWORD'),
-            account=os.getenv('SNOWFLAKE_ACCOUNT'),
-            host=os.getenv('SNOWFLAKE_HOST'),
-            warehouse=os.getenv('SNOWFLAKE_WAREHOUSE'),
-            database=os.getenv('SNOWFLAKE_DATABASE'),
-            schema=os.getenv('SNOWFLAKE_SCHEMA')
+@lru_cache(maxsize=None)
+def snowflake_modules():
+    """Import the Snowflake helpers on first use; the connector is slow to import
+    and isn't needed until the first count."""
+    from snowflake.connector.errors import OperationalError
+    from app import snowflake_db
+    return snowflake_db, OperationalError
+
+@lru_cache(maxsize=None)
+def snowflake_config():
+    """SNOWFLAKE_* connection settings, read once. Called lazily so the values
+    picked up by load_dotenv() in __main__ are the ones used."""
+    keys = ('USER', 'PASSWORD', 'ACCOUNT', 'HOST', 'WAREHOUSE', 'DATABASE', 'SCHEMA')
+    return {k.lower(): os.getenv(f'SNOWFLAKE_{k}') for k in keys}
+
+# One keep-alive session for every request in the run. Connection failures are
+# retried for any method, but responses only on 429/503 (the server did not act
+# on the request), so a retried POST can't insert a status row twice.
+SESSION = requests.Session()
+SESSION.mount("http://", HTTPAdapter(
+    pool_connections=10,
+    pool_maxsize=10,
+    max_retries=Retry(
+        total=3,
+        connect=3,
+        read=0,
+        backoff_factor=1,
+        status_forcelist=(429, 503),
+        allowed_methods=("GET", "POST"),
+        raise_on_status=False,
+    ),
+))
+
+def post_statuses(statuses, driver_id):
+    """POST every status at once (up to the pool's 10 connections); responses come back in order."""
+    with ThreadPoolExecutor(max_workers=min(10, len(statuses))) as pool:
+        return list(pool.map(
+            lambda status: SESSION.post("http://localhost:8000/api/status",
+                                        data={"status": status, "driver_id": driver_id}, timeout=(5, 10)),
+            statuses,
+        ))
+
+def flush_log(lines):
+    """Write buffered progress lines with a single write, then empty the buffer."""
+    if lines:
+        sys.stdout.write("\n".join(lines) + "\n")
+        sys.stdout.flush()
+        lines.clear()
+
+def with_retry(fn, max_attempts=4, base=0.5, cap=8.0, budget=20.0):
+    """Call fn, retrying transient Snowflake failures with decorrelated-jitter backoff.
+
+    Each sleep is drawn from [base, 3 * previous sleep] and capped at ``cap``;
+    no retry starts once ``budget`` seconds have passed.
+    """
+    _, OperationalError = snowflake_modules()
+    deadline = time.monotonic() + budget
+    delay = base
+    for attempt in range(1, max_attempts + 1):
+        try:
+            return fn()
+        except (OperationalError, requests.exceptions.ReadTimeout) as e:
+            delay = min(cap, random.uniform(base, delay * 3))
+            if attempt == max_attempts or time.monotonic() + delay > deadline:
+                raise
+            print(f"   ↻ Snowflake attempt {attempt} failed ({e}); retrying in {delay:.1f}s")
+            time.sleep(delay)
+
+def get_snowflake_counts():
+    """Get current (STATUS_TABLE, DROWSINESS_MEASUREMENTS) record counts in one query"""
+    snowflake_db, OperationalError = snowflake_modules()
+
+    def count_rows():
+        # One keep-alive session serves every count in the run.
+        conn = snowflake_db.shared_connection(
+            **snowflake_config(),
+            network_timeout=20,
+            **snowflake_db.small_result_options(),
         )
-        cur = conn.cursor()
-        cur.execute('SELECT COUNT(*) FROM STATUS_TABLE')
-        count = cur.fetchone()[0]
-        conn.close()
-        return count
+        try:
+            with conn.cursor() as cur:
+                cur.execute(
+                    'SELECT (SELECT COUNT(*) FROM STATUS_TABLE),'
+                    ' (SELECT COUNT(*) FROM DROWSINESS_MEASUREMENTS)'
+                )
+                return cur.fetchone()
+        except OperationalError:
+            # Drop a broken session so the retry logs in again.
+            conn.close()
+            raise
+
+    try:
+        return with_retry(count_rows)
     except Exception as e:
         print(f"Error checking Snowflake: {e}")
-        return -1
+        return -1, -1
+
+def wait_for_status_count(expected, timeout=10.0, interval=0.5):
+    """Poll the counts until STATUS_TABLE holds at least ``expected`` rows.
 
-def test_auto_clear():
+    /api/status returns as soon as the insert is queued, so rows can land a
+    moment after the POSTs come back. Returns the last counts seen.
+    """
+    deadline = time.monotonic() + timeout
+    counts = get_snowflake_counts()
+    while counts[0] != -1 and counts[0] < expected and time.monotonic() < deadline:
+        time.sleep(interval)
+        counts = get_snowflake_counts()
+    return counts
+
+def check_auto_clear():
     """Test the automatic clearing functionality"""
     
     print("🧪 Testing Auto-Clear Functionality")
@@ -42,21 +140,22 @@ def test_auto_clear():
     print("1. Adding test data...")
     test_statuses = ["OK", "DROWSY_SOON", "ASLEEP", "OK", "DROWSY_SOON"]
     
-    for status in test_statuses:
-        response = requests.post("http://localhost:8000/api/status", 
-                               data={"status": status, "driver_id": "test_driver"})
+    log = []
+    for status, response in zip(test_statuses, post_statuses(test_statuses, "test_driver")):
         if response.ok:
-            print(f"   ✅ Added {status}")
+            log.append(f"   ✅ Added {status}")
         else:
+            flush_log(log)
             print(f"   ❌ Failed to add {status}")
+    flush_log(log)
     
     # Check count after adding
-    count_after_adding = get_snowflake_count()
+    count_after_adding, _ = wait_for_status_count(len(test_statuses))
     print(f"\n📊 Records after adding: {count_after_adding}")
     
     # Step 2: Test manual reset (simulate what happens when demo starts)
     print("\n2. Testing manual reset (simulates new demo start)...")
-    response = requests.post("http://localhost:8000/api/session/reset", data={})
+    response = SESSION.post("http://localhost:8000/api/session/reset", data={}, timeout=(5, 10))
     
     if response.ok:
         result = response.json()
@@ -67,20 +166,22 @@ def test_auto_clear():
         print(f"   ❌ Reset failed: {response.status_code}")
     
     # Check count after reset
-    count_after_reset = get_snowflake_count()
-    print(f"\n📊 Records after reset: {count_after_reset}")
+    count_after_reset, drowsiness_after_reset = get_snowflake_counts()
+    print(f"\n📊 Records after reset: {count_after_reset} (drowsiness: {drowsiness_after_reset})")
     
     # Step 3: Add new data to simulate new demo
     print("\n3. Adding new demo data...")
     new_statuses = ["OK", "OK", "DROWSY_SOON"]
     
-    for status in new_statuses:
-        response = requests.post("http://localhost:8000/api/status", 
-                               data={"status": status, "driver_id": "new_demo_driver"})
+    new_responses = post_statuses(new_statuses, "new_demo_driver")
+    for status, response in zip(new_statuses, new_responses):
         if response.ok:
-            print(f"   ✅ Added {status}")
+            log.append(f"   ✅ Added {status}")
+    flush_log(log)
+    sent = Counter(new_statuses)
+    accepted = Counter(r.json().get("status") for r in new_responses if r.ok)
     
-    count_after_new = get_snowflake_count()
+    count_after_new, _ = wait_for_status_count(sent.total())
     print(f"\n📊 Records after new demo data: {count_after_new}")
     
     # Verify the behavior
@@ -90,21 +191,31 @@ def test_auto_clear():
     else:
         print(f"   ❌ Auto-clear failed: {count_after_reset} records remain")
     
-    if count_after_new == len(new_statuses):
+    if accepted == sent:
+        print("   ✅ API accepted every new status")
+    else:
+        print(f"   ❌ API accepted {dict(accepted)}, sent {dict(sent)}")
+    
+    if count_after_new == sent.total():
         print("   ✅ New data correctly added after clear")
     else:
-        print(f"   ❌ Expected {len(new_statuses)} records, got {count_after_new}")
+        print(f"   ❌ Expected {sent.total()} records, got {count_after_new}")
     
-    print("\n🎯 Summary:")
-    print(f"   Initial data: {count_after_adding} records")
-    print(f"   After clear:  {count_after_reset} records")  
-    print(f"   After new:    {count_after_new} records")
+    print(
+        "\n🎯 Summary:\n"
+        f"   Initial data: {count_after_adding} records\n"
+        f"   After clear:  {count_after_reset} records\n"
+        f"   After new:    {count_after_new} records"
+    )
     
-    if count_after_reset == 0 and count_after_new == len(new_statuses):
+    if count_after_reset == 0 and accepted == sent and count_after_new == sent.total():
         print("\n🎉 AUTO-CLEAR FUNCTIONALITY WORKING PERFECTLY!")
         print("   Each new demo will start with a clean STATUS_TABLE")
     else:
         print("\n❌ Auto-clear needs adjustment")
 
 if __name__ == "__main__":
-    test_auto_clear()
\ No newline at end of file
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    check_auto_clear()
\ No newline at end of file